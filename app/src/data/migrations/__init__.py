@@ -0,0 +1,130 @@
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from data.migrations import (
+    v0001_initial,
+    v0002_composite_keys,
+    v0003_outbox,
+    v0004_rating_windows,
+    v0005_scores_team_index,
+    v0006_team_ratings,
+)
+
+from utils.logger import logger_config
+
+log = logger_config(__name__)
+
+MIGRATIONS = [
+    v0001_initial,
+    v0002_composite_keys,
+    v0003_outbox,
+    v0004_rating_windows,
+    v0005_scores_team_index,
+    v0006_team_ratings,
+]
+
+# Arbitrary application-wide key for pg_advisory_xact_lock, so replicas
+# starting at the same time apply migrations one after another.
+MIGRATIONS_LOCK_KEY = 80830001
+# Held by the one replica building indexes concurrently, see `build_indexes`.
+INDEXES_LOCK_KEY = 80830002
+
+
+async def migrate(engine: AsyncEngine) -> list[int]:
+    async with engine.begin() as conn:
+        await conn.execute(
+            text("SELECT pg_advisory_xact_lock(:key)"), {"key": MIGRATIONS_LOCK_KEY}
+        )
+        await conn.execute(
+            text(
+                """
+                CREATE TABLE IF NOT EXISTS schema_migrations (
+                    version INTEGER PRIMARY KEY,
+                    description TEXT NOT NULL,
+                    applied_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT now()
+                )
+                """
+            )
+        )
+        result = await conn.execute(text("SELECT version FROM schema_migrations"))
+        applied_versions = set(result.scalars().all())
+
+        applied = []
+        for migration in MIGRATIONS:
+            if migration.VERSION in applied_versions:
+                continue
+            log.info(
+                "Applying migration %s: %s", migration.VERSION, migration.DESCRIPTION
+            )
+            await migration.upgrade(conn)
+            await conn.execute(
+                text(
+                    "INSERT INTO schema_migrations (version, description) "
+                    "VALUES (:version, :description)"
+                ),
+                {"version": migration.VERSION, "description": migration.DESCRIPTION},
+            )
+            applied.append(migration.VERSION)
+
+    log.info("Database schema up to date, applied migrations: %s", applied)
+    return applied
+
+
+async def build_indexes(engine: AsyncEngine) -> list[str]:
+    """
+    Creates the INDEXES declared by migrations with CREATE INDEX
+    CONCURRENTLY, which cannot run inside a transaction but does not block
+    writes to the table. An index left invalid by an interrupted build is
+    dropped and built again. Only one replica builds at a time; the others
+    skip the step and start right away.
+    """
+    built: list[str] = []
+    async with engine.connect() as conn:
+        conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+        result = await conn.execute(
+            text("SELECT pg_try_advisory_lock(:key)"), {"key": INDEXES_LOCK_KEY}
+        )
+        if not result.scalar():
+            log.info("Indexes are being built by another process, skipping")
+            return built
+        try:
+            for migration in MIGRATIONS:
+                for name, definition in getattr(migration, "INDEXES", {}).items():
+                    result = await conn.execute(
+                        text(
+                            "SELECT indisvalid FROM pg_index "
+                            "WHERE indexrelid = to_regclass(:name)"
+                        ),
+                        {"name": name},
+                    )
+                    valid = result.scalar()
+                    if valid:
+                        continue
+                    if valid is not None:
+                        log.warning("Rebuilding invalid index %s", name)
+                        await conn.execute(
+                            text(f"DROP INDEX CONCURRENTLY IF EXISTS {name}")
+                        )
+                    log.info("Building index %s", name)
+                    await conn.execute(
+                        text(f"CREATE INDEX CONCURRENTLY {name} {definition}")
+                    )
+                    built.append(name)
+        finally:
+            await conn.execute(
+                text("SELECT pg_advisory_unlock(:key)"), {"key": INDEXES_LOCK_KEY}
+            )
+    return built
+
+
+async def build_indexes_in_background(engine: AsyncEngine):
+    """
+    Runs `build_indexes` after startup, so a long build over a large table
+    never delays readiness. Queries work without the indexes, only slower.
+    """
+    try:
+        built = await build_indexes(engine)
+    except Exception as e:
+        log.error("Error building indexes: %s", e)
+        return
+    log.info("Indexes up to date, built: %s", built)
@@ -0,0 +1,29 @@
+"""
+Applies pending migrations and builds their indexes outside of app startup.
+
+Migrations that lock or scan large tables (see v0002_composite_keys) should
+be applied this way, during a maintenance window, before the new version of
+the service is rolled out.
+
+usage (from app/src):
+    python -m data.migrations
+"""
+
+import asyncio
+import sys
+
+from data.migrations import build_indexes, migrate
+from data.session import db
+
+
+async def main() -> int:
+    try:
+        await migrate(db.engine)
+        await build_indexes(db.engine)
+    finally:
+        await db.close_database()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
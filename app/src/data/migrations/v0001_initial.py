@@ -0,0 +1,31 @@
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+VERSION = 1
+DESCRIPTION = "Baseline schema previously created with metadata.create_all"
+
+STATEMENTS = [
+    """
+    CREATE TABLE IF NOT EXISTS player_ratings (
+        player_id SERIAL PRIMARY KEY,
+        team_id INTEGER,
+        average_score DOUBLE PRECISION,
+        total_of_scores INTEGER,
+        last_updated TIMESTAMP WITH TIME ZONE
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS scores (
+        score_id SERIAL PRIMARY KEY,
+        player_id INTEGER REFERENCES player_ratings (player_id),
+        team_id INTEGER,
+        score INTEGER,
+        created_at TIMESTAMP WITH TIME ZONE
+    )
+    """,
+]
+
+
+async def upgrade(conn: AsyncConnection):
+    for statement in STATEMENTS:
+        await conn.execute(text(statement))
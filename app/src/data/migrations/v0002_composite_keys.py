@@ -0,0 +1,43 @@
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+VERSION = 2
+DESCRIPTION = "Composite (team_id, player_id) key and indexes for hot lookups"
+
+# The key change takes an ACCESS EXCLUSIVE lock on player_ratings and
+# SET NOT NULL scans it, so on a deployment that already holds many ratings
+# apply this version offline (e.g. `make migrate` during a maintenance
+# window) rather than at startup. The scores foreign key is added NOT VALID
+# so the migration does not scan existing rows; new rows are still checked
+# against player_ratings.
+STATEMENTS = [
+    "ALTER TABLE scores DROP CONSTRAINT IF EXISTS scores_player_id_fkey",
+    "ALTER TABLE player_ratings DROP CONSTRAINT IF EXISTS player_ratings_pkey",
+    "ALTER TABLE player_ratings ALTER COLUMN player_id DROP DEFAULT",
+    "DROP SEQUENCE IF EXISTS player_ratings_player_id_seq",
+    "ALTER TABLE player_ratings ALTER COLUMN team_id SET NOT NULL",
+    """
+    ALTER TABLE player_ratings
+        ADD CONSTRAINT player_ratings_pkey PRIMARY KEY (team_id, player_id)
+    """,
+    """
+    ALTER TABLE scores
+        ADD CONSTRAINT scores_team_id_player_id_fkey
+        FOREIGN KEY (team_id, player_id)
+        REFERENCES player_ratings (team_id, player_id) NOT VALID
+    """,
+]
+
+# Built with CREATE INDEX CONCURRENTLY once the migration has committed, see
+# `build_indexes`.
+INDEXES = {
+    "ix_player_ratings_team_id_average_score": (
+        "ON player_ratings (team_id, average_score DESC, player_id DESC)"
+    ),
+    "ix_scores_player_id_created_at": "ON scores (player_id, created_at)",
+}
+
+
+async def upgrade(conn: AsyncConnection):
+    for statement in STATEMENTS:
+        await conn.execute(text(statement))
@@ -0,0 +1,21 @@
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+VERSION = 3
+DESCRIPTION = "Transactional outbox for events published by the relay"
+
+STATEMENTS = [
+    """
+    CREATE TABLE IF NOT EXISTS outbox_events (
+        id BIGSERIAL PRIMARY KEY,
+        event_type VARCHAR NOT NULL,
+        payload JSONB NOT NULL,
+        created_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT now()
+    )
+    """,
+]
+
+
+async def upgrade(conn: AsyncConnection):
+    for statement in STATEMENTS:
+        await conn.execute(text(statement))
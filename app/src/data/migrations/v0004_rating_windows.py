@@ -0,0 +1,37 @@
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+VERSION = 4
+DESCRIPTION = "Rolling window state for last-N-scores and last-D-days ratings"
+
+STATEMENTS = [
+    """
+    ALTER TABLE player_ratings
+        ADD COLUMN IF NOT EXISTS recent_scores INTEGER[] NOT NULL DEFAULT '{}'
+    """,
+    # Appends new scores to a window and keeps only the newest `size` of them.
+    """
+    CREATE OR REPLACE FUNCTION append_window(window_scores INTEGER[], new_scores INTEGER[], size INTEGER)
+    RETURNS INTEGER[] AS $$
+        SELECT (window_scores || new_scores)[
+            greatest(cardinality(window_scores || new_scores) - size + 1, 1):
+        ]
+    $$ LANGUAGE sql IMMUTABLE
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS player_daily_scores (
+        team_id INTEGER NOT NULL,
+        player_id INTEGER NOT NULL,
+        day DATE NOT NULL,
+        score_sum BIGINT NOT NULL,
+        score_count INTEGER NOT NULL,
+        PRIMARY KEY (team_id, player_id, day)
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS ix_player_daily_scores_day ON player_daily_scores (day)",
+]
+
+
+async def upgrade(conn: AsyncConnection):
+    for statement in STATEMENTS:
+        await conn.execute(text(statement))
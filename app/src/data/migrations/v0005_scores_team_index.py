@@ -0,0 +1,16 @@
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+VERSION = 5
+DESCRIPTION = "Index scores by team and player for streaming rating rebuilds"
+
+# Built with CREATE INDEX CONCURRENTLY once the migration has committed, see
+# `build_indexes`, since scores is the largest table.
+INDEXES = {
+    "ix_scores_team_id_player_id_created_at": (
+        "ON scores (team_id, player_id, created_at)"
+    ),
+}
+
+
+async def upgrade(conn: AsyncConnection):
+    pass
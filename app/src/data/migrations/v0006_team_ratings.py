@@ -0,0 +1,45 @@
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+VERSION = 6
+DESCRIPTION = "Team rating aggregates, backfilled from player ratings"
+
+STATEMENTS = [
+    """
+    CREATE TABLE IF NOT EXISTS team_ratings (
+        team_id INTEGER PRIMARY KEY,
+        player_count INTEGER NOT NULL,
+        score_sum DOUBLE PRECISION NOT NULL,
+        score_count INTEGER NOT NULL,
+        average_score DOUBLE PRECISION,
+        last_updated TIMESTAMP WITH TIME ZONE
+    )
+    """,
+    # Rows written by live score updates before this migration only hold
+    # their deltas, so every team is recomputed from its player ratings.
+    """
+    INSERT INTO team_ratings (
+        team_id, player_count, score_sum, score_count, average_score, last_updated
+    )
+    SELECT
+        team_id,
+        count(*),
+        coalesce(sum(average_score * total_of_scores), 0),
+        coalesce(sum(total_of_scores), 0),
+        sum(average_score * total_of_scores) / nullif(sum(total_of_scores), 0),
+        now()
+    FROM player_ratings
+    GROUP BY team_id
+    ON CONFLICT (team_id) DO UPDATE SET
+        player_count = excluded.player_count,
+        score_sum = excluded.score_sum,
+        score_count = excluded.score_count,
+        average_score = excluded.average_score,
+        last_updated = excluded.last_updated
+    """,
+]
+
+
+async def upgrade(conn: AsyncConnection):
+    for statement in STATEMENTS:
+        await conn.execute(text(statement))
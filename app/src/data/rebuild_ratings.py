@@ -0,0 +1,207 @@
+"""
+Recomputes player_ratings, their rolling windows and team_ratings from the
+scores table.
+
+    python -m data.rebuild_ratings [--teams 1 2 3] [--workers 4] [--chunk-size 10000]
+        [--write-batch-size 1000]
+
+Run from app/src. Teams are rebuilt concurrently, one transaction per team.
+Each team's scores are streamed in player order through a server-side
+cursor, so memory stays bounded by the chunk size however many scores
+there are. Rebuilt rows are written in statements of at most
+--write-batch-size rows, which keeps each one under the driver's bind
+parameter limit.
+"""
+
+import argparse
+import asyncio
+from collections import deque
+from dataclasses import dataclass, field
+from datetime import date, datetime, timezone
+import sys
+from time import monotonic
+from typing import Any, Deque, Dict, List, Optional
+
+from data.session import db
+
+from events.outbox import stage_events
+
+from repository.player_daily_score_repository import PlayerDailyScoreRepository
+from repository.player_rating_repository import PlayerRatingRepository
+from repository.score_repository import ScoreRepository
+from repository.team_rating_repository import TeamRatingRepository
+
+from service.rating_service import RATING_WINDOW_SCORES, window_start
+
+from utils.logger import logger_config
+
+log = logger_config(__name__)
+
+
+@dataclass
+class PlayerTotals:
+    player_id: int
+    score_sum: int = 0
+    score_count: int = 0
+    recent_scores: Deque[int] = field(
+        default_factory=lambda: deque(maxlen=RATING_WINDOW_SCORES)
+    )
+    days: Dict[date, List[int]] = field(default_factory=dict)
+
+    def add(self, score: int, created_at: Optional[datetime], since: date):
+        self.score_sum += score
+        self.score_count += 1
+        self.recent_scores.append(score)
+        if created_at is not None and created_at.date() >= since:
+            bucket = self.days.setdefault(created_at.date(), [0, 0])
+            bucket[0] += score
+            bucket[1] += 1
+
+
+class RatingRebuild:
+    def __init__(self, workers: int, chunk_size: int, write_batch_size: int = 1000):
+        self.workers = max(1, workers)
+        self.chunk_size = max(1, chunk_size)
+        self.write_batch_size = max(1, write_batch_size)
+        self.teams_total = 0
+        self.teams_done = 0
+        self.teams_failed: List[int] = []
+        self.scores_read = 0
+        self.players_written = 0
+        self.started = monotonic()
+
+    async def run(self, team_ids: Optional[List[int]] = None) -> bool:
+        if team_ids is None:
+            async with db.unit_of_work() as session:
+                team_ids = await PlayerRatingRepository.get_team_ids(session)
+        self.teams_total = len(team_ids)
+        log.info(
+            "Rebuilding ratings for %s teams with %s workers",
+            self.teams_total,
+            self.workers,
+        )
+        queue: asyncio.Queue = asyncio.Queue()
+        for team_id in team_ids:
+            queue.put_nowait(team_id)
+        reporter = asyncio.create_task(self._report_periodically())
+        try:
+            await asyncio.gather(*(self._worker(queue) for _ in range(self.workers)))
+        finally:
+            reporter.cancel()
+        self.report()
+        return not self.teams_failed
+
+    async def _worker(self, queue: asyncio.Queue):
+        while not queue.empty():
+            team_id = queue.get_nowait()
+            try:
+                await self.rebuild_team(team_id)
+            except Exception as e:
+                log.error("Failed to rebuild ratings for team %s: %s", team_id, e)
+                self.teams_failed.append(team_id)
+            self.teams_done += 1
+
+    async def rebuild_team(self, team_id: int):
+        since = window_start()
+        now = datetime.now(timezone.utc)
+        ratings: List[Dict[str, Any]] = []
+        buckets: List[Dict[str, Any]] = []
+
+        def emit(totals: PlayerTotals):
+            ratings.append(
+                {
+                    "team_id": team_id,
+                    "player_id": totals.player_id,
+                    "average_score": totals.score_sum / totals.score_count,
+                    "total_of_scores": totals.score_count,
+                    "recent_scores": list(totals.recent_scores),
+                    "last_updated": now,
+                }
+            )
+            buckets.extend(
+                {
+                    "team_id": team_id,
+                    "player_id": totals.player_id,
+                    "day": day,
+                    "score_sum": score_sum,
+                    "score_count": score_count,
+                }
+                for day, (score_sum, score_count) in totals.days.items()
+            )
+
+        async def write():
+            size = self.write_batch_size
+            for start in range(0, len(ratings), size):
+                await PlayerRatingRepository.replace_many(
+                    session, ratings[start : start + size]
+                )
+            for start in range(0, len(buckets), size):
+                await PlayerDailyScoreRepository.replace_many(
+                    session, buckets[start : start + size]
+                )
+            self.players_written += len(ratings)
+            ratings.clear()
+            buckets.clear()
+
+        async with db.unit_of_work() as session:
+            # Live score updates for this team wait until its rebuild commits
+            # instead of being overwritten by it.
+            await PlayerRatingRepository.lock_team(session, team_id)
+            await PlayerDailyScoreRepository.delete_by_team_id(session, team_id)
+            totals: Optional[PlayerTotals] = None
+            async for chunk in ScoreRepository.stream_by_team_id(
+                session, team_id, self.chunk_size
+            ):
+                for player_id, score, created_at in chunk:
+                    if totals is None or totals.player_id != player_id:
+                        if totals is not None:
+                            emit(totals)
+                        totals = PlayerTotals(player_id)
+                    totals.add(score, created_at, since)
+                self.scores_read += len(chunk)
+                if max(len(ratings), len(buckets)) >= self.write_batch_size:
+                    await write()
+            if totals is not None:
+                emit(totals)
+            await write()
+            await TeamRatingRepository.rebuild(session, [team_id])
+            await stage_events(session, [("rating_updated", {"team_id": team_id})])
+
+    async def _report_periodically(self, interval: float = 5):
+        while True:
+            await asyncio.sleep(interval)
+            self.report()
+
+    def report(self):
+        elapsed = monotonic() - self.started
+        log.info(
+            "Rebuilt %s/%s teams (%s failed), %s scores read, "
+            "%s ratings written in %.1fs (%.0f scores/s)",
+            self.teams_done,
+            self.teams_total,
+            len(self.teams_failed),
+            self.scores_read,
+            self.players_written,
+            elapsed,
+            self.scores_read / elapsed if elapsed else 0,
+        )
+
+
+async def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--teams", type=int, nargs="+", help="Only these team ids")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--chunk-size", type=int, default=10000)
+    parser.add_argument("--write-batch-size", type=int, default=1000)
+    args = parser.parse_args(argv)
+
+    rebuild = RatingRebuild(args.workers, args.chunk_size, args.write_batch_size)
+    try:
+        succeeded = await rebuild.run(args.teams)
+    finally:
+        await db.close_database()
+    return 0 if succeeded else 1
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
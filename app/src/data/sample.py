@@ -1,12 +1,32 @@
+"""
+Sample data seeding and bulk fixture loading.
+
+    python -m data.sample player_ratings ratings.csv
+    python -m data.sample scores scores.jsonl
+
+Fixtures are JSON arrays, JSON Lines (.jsonl) or CSV files with a header
+row. JSON Lines and CSV are streamed, and rows are written with COPY.
+"""
+
+import argparse
+import asyncio
+import csv
 from datetime import datetime
+from itertools import chain, islice
 import json
 import os
+from typing import Any, AsyncIterator, Callable, Dict, Iterable, Iterator, List
 
+from sqlalchemy import DateTime, Float, Integer, insert
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
+from sqlalchemy.sql import exists
+
+from data.session import db
 
 from models.score_model import Score
 from models.player_rating_model import PlayerRating
+from repository.team_rating_repository import TeamRatingRepository
 
 from utils.logger import logger_config
 
@@ -14,29 +34,135 @@ log = logger_config(__name__)
 
 current_directory = os.path.dirname(os.path.abspath(__file__))
 
+BULK_CHUNK_SIZE = 5000
+
+FIXTURE_MODELS = {"player_ratings": PlayerRating, "scores": Score}
+
+
+async def table_is_empty(session: AsyncSession, model) -> bool:
+    # EXISTS stops at the first row instead of reading the whole table.
+    result = await session.execute(select(exists().select_from(model)))
+    return not result.scalar()
+
+
+def read_fixture(path: str) -> Iterator[Dict[str, Any]]:
+    if path.endswith(".csv"):
+        with open(path, newline="") as f:
+            yield from csv.DictReader(f)
+    elif path.endswith(".jsonl"):
+        with open(path) as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+    else:
+        with open(path) as f:
+            yield from json.load(f)
+
+
+def column_parsers(model) -> Dict[str, Callable[[Any], Any]]:
+    parsers: Dict[str, Callable[[Any], Any]] = {}
+    for column in model.__table__.columns:
+        if isinstance(column.type, DateTime):
+            parsers[column.name] = datetime.fromisoformat
+        elif isinstance(column.type, Integer):
+            parsers[column.name] = int
+        elif isinstance(column.type, Float):
+            parsers[column.name] = float
+    return parsers
+
+
+def identity(value: Any) -> Any:
+    return value
 
-async def insert_sample_data(session: AsyncSession, model, sample_data):
-    result = await session.execute(select(model))
-    records = result.scalars().all()
 
-    if not records:
-        session.add_all(sample_data)
+def to_records(
+    model, columns: List[str], rows: Iterable[Dict[str, Any]]
+) -> Iterator[tuple]:
+    parsers = column_parsers(model)
+    convert = [parsers.get(column, identity) for column in columns]
+    for row in rows:
+        yield tuple(
+            None if row.get(column) in (None, "") else parse(row[column])
+            for column, parse in zip(columns, convert)
+        )
+
+
+async def bulk_load(session: AsyncSession, model, rows: Iterable[Dict[str, Any]]):
+    """
+    Writes `rows` into the model's table with COPY when the driver supports
+    it, otherwise with multi-row executemany in chunks. Columns are taken
+    from the first row; missing columns get their server default.
+    """
+    rows = iter(rows)
+    first = next(rows, None)
+    if first is None:
+        return 0
+    columns = [column for column in first if column in model.__table__.columns]
+    records = to_records(model, columns, chain([first], rows))
+
+    connection = await session.connection()
+    raw_connection = (await connection.get_raw_connection()).driver_connection
+    if raw_connection is not None and hasattr(raw_connection, "copy_records_to_table"):
+        counter = [0]
+
+        async def counted() -> AsyncIterator[tuple]:
+            for record in records:
+                counter[0] += 1
+                yield record
+
+        await raw_connection.copy_records_to_table(
+            model.__tablename__, records=counted(), columns=columns
+        )
+        loaded = counter[0]
+    else:
+        loaded = 0
+        while chunk := list(islice(records, BULK_CHUNK_SIZE)):
+            await session.execute(
+                insert(model), [dict(zip(columns, record)) for record in chunk]
+            )
+            loaded += len(chunk)
+    log.info("Loaded %s rows into %s", loaded, model.__tablename__)
+    return loaded
+
+
+async def load_fixture(session: AsyncSession, model, rows: Iterable[Dict[str, Any]]):
+    await bulk_load(session, model, rows)
+    # Loaded ratings get their team aggregates in the same transaction.
+    if model is PlayerRating:
+        await TeamRatingRepository.rebuild(session)
+
+
+async def insert_sample_data(session: AsyncSession, model, path: str):
+    if await table_is_empty(session, model):
+        await load_fixture(session, model, read_fixture(path))
         await session.commit()
 
 
 async def insert_sample_scores(session: AsyncSession):
-    with open(os.path.join(current_directory, "scores.json"), "r") as f:
-        sample_scores = json.load(f)
-    for score in sample_scores:
-        score["created_at"] = datetime.fromisoformat(score["created_at"])
-    scores = [Score(**score) for score in sample_scores]
-    await insert_sample_data(session, Score, scores)
+    await insert_sample_data(
+        session, Score, os.path.join(current_directory, "scores.json")
+    )
 
 
 async def insert_sample_player_ratings(session: AsyncSession):
-    with open(os.path.join(current_directory, "player_ratings.json"), "r") as f:
-        sample_player_ratings = json.load(f)
-    for rating in sample_player_ratings:
-        rating["last_updated"] = datetime.fromisoformat(rating["last_updated"])
-    player_ratings = [PlayerRating(**rating) for rating in sample_player_ratings]
-    await insert_sample_data(session, PlayerRating, player_ratings)
+    await insert_sample_data(
+        session, PlayerRating, os.path.join(current_directory, "player_ratings.json")
+    )
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("table", choices=sorted(FIXTURE_MODELS))
+    parser.add_argument("path")
+    args = parser.parse_args()
+    try:
+        async with db.unit_of_work() as session:
+            await load_fixture(
+                session, FIXTURE_MODELS[args.table], read_fixture(args.path)
+            )
+    finally:
+        await db.close_database()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
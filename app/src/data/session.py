@@ -1,13 +1,17 @@
+from sqlalchemy import event
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.ext.declarative import declarative_base
 
 from contextlib import asynccontextmanager
+from time import perf_counter
 
-from typing import AsyncGenerator
+from typing import Any, AsyncGenerator, Dict
 
 from utils.logger import logger_config
 from utils.config import get_settings
+from utils.metrics import CallbackGauge, Histogram, registry
 
 log = logger_config(__name__)
 settings = get_settings()
@@ -19,8 +23,23 @@ class DatabaseSession:
     def __init__(self):
         self.engine = create_async_engine(
             settings.SQLALCHEMY_DATABASE_URI,
-            echo=True,
+            echo=settings.DB_ECHO,
+            pool_size=settings.DB_POOL_SIZE,
+            max_overflow=settings.DB_MAX_OVERFLOW,
+            pool_timeout=settings.DB_POOL_TIMEOUT,
+            pool_pre_ping=settings.DB_POOL_PRE_PING,
+            pool_recycle=settings.DB_POOL_RECYCLE,
+            connect_args={
+                "prepared_statement_cache_size": settings.DB_STATEMENT_CACHE_SIZE
+            },
         )
+        self.pool_wait = Histogram()
+        self.pool_hold = Histogram()
+        self.pool_timeouts = 0
+        self.pool_connects = 0
+        event.listen(self.engine.sync_engine, "connect", self._on_connect)
+        event.listen(self.engine.sync_engine, "checkout", self._on_checkout)
+        event.listen(self.engine.sync_engine, "checkin", self._on_checkin)
 
         self.SessionLocal = sessionmaker(
             autocommit=False,
@@ -32,6 +51,32 @@ class DatabaseSession:
 
         self.metadata = Base.metadata
 
+    def _on_connect(self, dbapi_connection, connection_record):
+        self.pool_connects += 1
+
+    def _on_checkout(self, dbapi_connection, connection_record, connection_proxy):
+        connection_record.info["checked_out_at"] = perf_counter()
+
+    def _on_checkin(self, dbapi_connection, connection_record):
+        checked_out_at = connection_record.info.pop("checked_out_at", None)
+        if checked_out_at is not None:
+            self.pool_hold.observe(perf_counter() - checked_out_at)
+
+    def pool_status(self) -> Dict[str, Any]:
+        pool = self.engine.pool
+        return {
+            "size": pool.size(),
+            "checked_out": pool.checkedout(),
+            "idle": pool.checkedin(),
+            "overflow": pool.overflow(),
+            "max_overflow": settings.DB_MAX_OVERFLOW,
+            "timeout_seconds": settings.DB_POOL_TIMEOUT,
+            "connects": self.pool_connects,
+            "timeouts": self.pool_timeouts,
+            "wait_seconds": self.pool_wait.snapshot(),
+            "hold_seconds": self.pool_hold.snapshot(),
+        }
+
     async def create_database(self):
         async with self.engine.begin() as conn:
             await conn.run_sync(self.metadata.create_all)
@@ -50,6 +95,24 @@ class DatabaseSession:
     async def __aexit__(self, exc_type, exc_val, exc_tb):
         await self.db.close()
 
+    @asynccontextmanager
+    async def unit_of_work(self) -> AsyncGenerator[AsyncSession, None]:
+        """
+        One session and one transaction for a whole service operation.
+        Repositories receive the session, the transaction commits when the
+        block exits and rolls back if it raises.
+        """
+        async with self.SessionLocal() as db:
+            async with db.begin():
+                started = perf_counter()
+                try:
+                    await db.connection()
+                except PoolTimeoutError:
+                    self.pool_timeouts += 1
+                    raise
+                self.pool_wait.observe(perf_counter() - started)
+                yield db
+
     @asynccontextmanager
     async def get_db(self) -> AsyncGenerator[AsyncSession, None]:
         async with self.SessionLocal() as db:
@@ -62,16 +125,55 @@ class DatabaseSession:
             finally:
                 await db.close()
 
-    @asynccontextmanager
-    async def commit_rollback(self, session: AsyncSession):
-        try:
-            yield session
-            await session.commit()
-        except Exception as e:
-            await session.rollback()
-            raise e
-        finally:
-            await session.close()
-
 
 db = DatabaseSession()
+
+registry.register(
+    "db_pool_size",
+    "gauge",
+    "Connections the pool keeps open",
+    CallbackGauge(lambda: db.engine.pool.size()),
+)
+registry.register(
+    "db_pool_checked_out",
+    "gauge",
+    "Connections currently checked out of the pool",
+    CallbackGauge(lambda: db.engine.pool.checkedout()),
+)
+registry.register(
+    "db_pool_idle",
+    "gauge",
+    "Connections open and waiting in the pool",
+    CallbackGauge(lambda: db.engine.pool.checkedin()),
+)
+registry.register(
+    "db_pool_overflow",
+    "gauge",
+    "Connections open beyond the pool size",
+    # SQLAlchemy reports the overflow as negative while the pool is not full.
+    CallbackGauge(lambda: max(0, db.engine.pool.overflow())),
+)
+registry.register(
+    "db_pool_connects_total",
+    "counter",
+    "Connections opened by the pool",
+    CallbackGauge(lambda: db.pool_connects),
+)
+registry.register(
+    "db_pool_timeouts_total",
+    "counter",
+    "Checkouts that timed out waiting for a connection",
+    CallbackGauge(lambda: db.pool_timeouts),
+)
+registry.register(
+    "db_pool_wait_seconds",
+    "histogram",
+    "Time spent waiting for a connection",
+    db.pool_wait,
+)
+registry.register(
+    "db_pool_hold_seconds",
+    "histogram",
+    "Time a connection stays checked out",
+    db.pool_hold,
+)
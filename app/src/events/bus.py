@@ -0,0 +1,49 @@
+from fastapi import FastAPI
+from typing import Any, Dict, Iterable
+from uuid import uuid4
+
+from events.consumer import LOCALLY_HANDLED_HEADER, Consumer
+from events.publisher import Publisher
+
+from utils.logger import logger_config
+
+log = logger_config(__name__)
+
+INSTANCE_ID = uuid4().hex
+
+
+class LocalEventBus:
+    """
+    Drop-in replacement for the Publisher. Every event is still published to
+    the exchange for other services, but event types this service handles
+    itself are also dispatched straight to the local consumer and tagged so
+    that no replica applies the broker copy a second time. Only used when
+    the outbox is disabled, since the outbox relay publishes every event.
+    """
+
+    def __init__(
+        self,
+        publisher: Publisher,
+        consumer: Consumer,
+        app: FastAPI,
+        event_types: Iterable[str],
+    ):
+        self.publisher = publisher
+        self.consumer = consumer
+        self.app = app
+        self.event_types = set(event_types)
+
+    async def publish(self, message: Dict[str, Any], headers=None):
+        if message["event_type"] not in self.event_types:
+            await self.publisher.publish(message, headers=headers)
+            return
+        await self.publisher.publish(
+            message, headers={**(headers or {}), LOCALLY_HANDLED_HEADER: INSTANCE_ID}
+        )
+        await self.consumer.dispatch_local(self.app, message)
+
+    async def flush(self):
+        await self.publisher.flush()
+
+    async def close(self):
+        await self.publisher.close()
@@ -0,0 +1,82 @@
+from datetime import datetime
+from typing import Any, Dict, Optional, Tuple, Union
+
+import msgpack  # type: ignore
+import orjson
+
+from utils.config import get_settings
+
+settings = get_settings()
+
+JSON_CONTENT_TYPE = "application/json"
+MSGPACK_CONTENT_TYPE = "application/msgpack"
+
+
+class EventDecodeError(ValueError):
+    pass
+
+
+def _default(obj: Any) -> str:
+    if isinstance(obj, datetime):
+        return obj.isoformat()
+    raise TypeError(f"Object of type {type(obj).__name__} is not serializable")
+
+
+class JsonCodec:
+    content_type = JSON_CONTENT_TYPE
+
+    def encode(self, message: Dict[str, Any]) -> bytes:
+        return orjson.dumps(message, default=_default)
+
+    def decode(self, body: bytes) -> Dict[str, Any]:
+        return orjson.loads(body)
+
+
+class MsgpackCodec:
+    content_type = MSGPACK_CONTENT_TYPE
+
+    def encode(self, message: Dict[str, Any]) -> bytes:
+        return msgpack.packb(message, default=_default, use_bin_type=True)
+
+    def decode(self, body: bytes) -> Dict[str, Any]:
+        return msgpack.unpackb(body, raw=False)
+
+
+Codec = Union[JsonCodec, MsgpackCodec]
+
+CODECS: Dict[str, Codec] = {
+    "json": JsonCodec(),
+    "msgpack": MsgpackCodec(),
+}
+
+DECODERS: Dict[str, Codec] = {codec.content_type: codec for codec in CODECS.values()}
+
+
+def get_codec(name: str = settings.EVENT_CODEC) -> Codec:
+    try:
+        return CODECS[name]
+    except KeyError:
+        raise ValueError(
+            f"Unknown event codec {name}, expected one of {list(CODECS)}"
+        ) from None
+
+
+def encode(message: Dict[str, Any], codec: Optional[Codec] = None) -> Tuple[bytes, str]:
+    codec = codec or get_codec()
+    return codec.encode(message), codec.content_type
+
+
+def decode(body: bytes, content_type: Optional[str] = None) -> Dict[str, Any]:
+    # Messages from other services may carry no content type (or a charset
+    # suffix); anything that is not a known binary codec is read as JSON.
+    media_type = (content_type or JSON_CONTENT_TYPE).split(";")[0].strip().lower()
+    codec = DECODERS.get(media_type, CODECS["json"])
+    try:
+        message = codec.decode(body)
+    except Exception as e:
+        raise EventDecodeError(f"Invalid {codec.content_type} message: {e}") from e
+    if not isinstance(message, dict):
+        raise EventDecodeError(
+            f"Expected an object, got {type(message).__name__} in {codec.content_type} message"
+        )
+    return message
@@ -2,76 +2,583 @@ from fastapi import FastAPI
 import aio_pika
 from aio_pika import connect_robust, IncomingMessage
 from aio_pika.exceptions import ConnectionClosed, ChannelClosed
-import json
 import asyncio
+from time import perf_counter
+from typing import (
+    Any,
+    Awaitable,
+    Callable,
+    Dict,
+    Hashable,
+    Iterable,
+    List,
+    Optional,
+    Set,
+    Tuple,
+)
+
+from events.codec import EventDecodeError, decode, encode
 
 from service.rating_service import RatingService
 
 from utils.logger import logger_config
 from utils.config import get_settings
+from utils.metrics import (
+    consumer_handling_seconds,
+    consumer_in_flight,
+    consumer_messages,
+)
 
 log = logger_config(__name__)
 settings = get_settings()
 
+LOCALLY_HANDLED_HEADER = "x-handled-locally-by"
+
+# In work queue mode these events are consumed once per deployment from the
+# shared queue, while cache invalidations still reach every replica.
+WORK_EVENT_TYPES = {"player_created", "score_created"}
+BROADCAST_EVENT_TYPES = {"rating_updated"}
+
+# Event types come from message bodies, so anything unknown shares one
+# metrics label instead of growing the label set without bound.
+METRIC_EVENT_TYPES = WORK_EVENT_TYPES | BROADCAST_EVENT_TYPES
+OTHER_EVENT_TYPE = "other"
+
+ATTEMPTS_HEADER = "x-attempts"
+
+score_handling_seconds = consumer_handling_seconds.labels("score_created")
+scores_in_flight = consumer_in_flight.labels("score_created")
+
+
+def event_label(event_type: Any) -> str:
+    if isinstance(event_type, str) and event_type in METRIC_EVENT_TYPES:
+        return event_type
+    return OTHER_EVENT_TYPE
+
+
+def retry_delays(max_attempts: int, base_delay_ms: int) -> List[int]:
+    """Backoff before attempt 2, 3, ... max_attempts, doubling each time."""
+    return [base_delay_ms * 2**n for n in range(max(0, max_attempts - 1))]
+
+
+class PartitionedWorkerPool:
+    """
+    Bounded pool of async workers. Jobs submitted with the same key always
+    run on the same worker, so they are applied in submission order, while
+    jobs with different keys run concurrently up to the pool size.
+    """
+
+    def __init__(self, size: int):
+        self.size = max(1, size)
+        self.queues: List[asyncio.Queue] = []
+        self.tasks: List[asyncio.Task] = []
+
+    def start(self):
+        if self.tasks:
+            return
+        self.queues = [asyncio.Queue() for _ in range(self.size)]
+        self.tasks = [asyncio.create_task(self._worker(queue)) for queue in self.queues]
+
+    async def submit(self, key: Hashable, job: Callable[[], Awaitable[None]]):
+        if not self.tasks:
+            self.start()
+        await self.queues[hash(key) % self.size].put(job)
+
+    async def _worker(self, queue: asyncio.Queue):
+        while True:
+            job = await queue.get()
+            try:
+                await job()
+            except Exception as e:
+                log.error("Error processing job: %s", e)
+            finally:
+                queue.task_done()
+
+    async def join(self):
+        await asyncio.gather(*(queue.join() for queue in self.queues))
+
+    async def close(self):
+        for task in self.tasks:
+            task.cancel()
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+        self.tasks = []
+        self.queues = []
+
+
+def score_payload(data: Any) -> Optional[Dict[str, int]]:
+    """
+    Returns the score_created payload with its ids and score as ints, or
+    None when any of them is missing or not a number.
+    """
+    if not isinstance(data, dict):
+        return None
+    try:
+        return {
+            "player_id": int(data["player_id"]),
+            "team_id": int(data["team_id"]),
+            "score": int(data["score"]),
+        }
+    except (KeyError, TypeError, ValueError):
+        return None
+
+
+class ScoreBatcher:
+    """
+    Buffers score_created messages until either max_size messages or
+    max_delay_ms have accumulated, applies them with a single call and
+    acks the messages whose rating was updated. The rest are handed to
+    `fail`. Malformed payloads are rejected as they are added, so they can
+    never take the rest of a batch down with them.
+    """
+
+    def __init__(
+        self,
+        apply: Callable[[List[Dict[str, Any]]], Awaitable[Set[Tuple[int, int]]]],
+        fail: Callable[[Optional[IncomingMessage], Dict[str, Any]], Awaitable[None]],
+        max_size: int,
+        max_delay_ms: int,
+    ):
+        self.apply = apply
+        self.fail = fail
+        self.max_size = max(1, max_size)
+        self.max_delay = max_delay_ms / 1000
+        self.buffer: List[Tuple[Optional[IncomingMessage], Dict[str, Any]]] = []
+        self.lock = asyncio.Lock()
+        self.timer: Optional[asyncio.TimerHandle] = None
+        self.pending: Set[asyncio.Task] = set()
+
+    async def add(self, message: Optional[IncomingMessage], data: Any) -> bool:
+        score = score_payload(data)
+        if score is None:
+            log.error("Rejecting malformed score_created payload: %r", data)
+            if message is not None:
+                await message.reject()
+            return False
+        self.buffer.append((message, score))
+        scores_in_flight.inc()
+        if len(self.buffer) >= self.max_size:
+            await self.flush()
+        elif self.timer is None:
+            self.timer = asyncio.get_running_loop().call_later(
+                self.max_delay, self._schedule_flush
+            )
+        return True
+
+    def _schedule_flush(self):
+        self.timer = None
+        task = asyncio.create_task(self.flush())
+        self.pending.add(task)
+        task.add_done_callback(self.pending.discard)
+
+    async def flush(self):
+        if self.timer is not None:
+            self.timer.cancel()
+            self.timer = None
+        async with self.lock:
+            batch, self.buffer = self.buffer, []
+            if not batch:
+                return
+            started = perf_counter()
+            try:
+                applied = await self.apply([data for _, data in batch])
+            except Exception as e:
+                log.error("Error applying batch of %s scores: %s", len(batch), e)
+                applied = set()
+            score_handling_seconds.observe(perf_counter() - started)
+            try:
+                for message, data in batch:
+                    try:
+                        await self._settle(message, data, applied)
+                    except Exception as e:
+                        log.error("Error settling score message: %s", e)
+            finally:
+                scores_in_flight.dec(len(batch))
+
+    async def _settle(
+        self,
+        message: Optional[IncomingMessage],
+        data: Dict[str, Any],
+        applied: Set[Tuple[int, int]],
+    ):
+        if (data["player_id"], data["team_id"]) in applied:
+            if message is not None:
+                await message.ack()
+        else:
+            log.warning("Player rating not found for score: %s", data)
+            await self.fail(message, {"event_type": "score_created", "data": data})
+
+    async def close(self):
+        await self.flush()
+        await asyncio.gather(*self.pending, return_exceptions=True)
+
+
+def partition_key(message_data: Dict[str, Any]) -> Optional[int]:
+    data = message_data.get("data") or {}
+    return data.get("player_id", data.get("team_id"))
+
 
 class Consumer:
     def __init__(
         self,
         connection: aio_pika.abc.AbstractRobustConnection,
         exchange_name: str = settings.EXCHANGE_NAME,
+        prefetch_count: int = settings.CONSUMER_PREFETCH_COUNT,
+        max_workers: int = settings.CONSUMER_MAX_WORKERS,
+        batch_size: int = settings.SCORE_BATCH_MAX_SIZE,
+        batch_delay_ms: int = settings.SCORE_BATCH_MAX_DELAY_MS,
+        local_event_types: Iterable[str] = (),
+        work_queue: bool = settings.CONSUMER_WORK_QUEUE,
+        queue_name: str = settings.QUEUE_NAME,
+        max_attempts: int = settings.CONSUMER_MAX_ATTEMPTS,
+        retry_base_delay_ms: int = settings.CONSUMER_RETRY_BASE_DELAY_MS,
     ):
         self.exchange_name = exchange_name
+        self.prefetch_count = prefetch_count
         self.connection = connection
+        self.work_queue = work_queue
+        self.queue_name = queue_name
+        self.app: Optional[FastAPI] = None
         self.channel = None
         self.exchange = None
         self.queue = None
+        self.consumer_tag = None
+        self.consume_task: Optional[asyncio.Task] = None
+        self.broadcast_queue = None
+        self.broadcast_consumer_tag = None
+        self.max_attempts = max(1, max_attempts)
+        self.retry_delays = retry_delays(self.max_attempts, retry_base_delay_ms)
+        self.dead_letter_exchange_name = f"{exchange_name}.dlx"
+        self.dead_letter_exchange = None
+        self.dead_letter_queue = None
+        self.workers = PartitionedWorkerPool(max_workers)
+        self.local_event_types = set(local_event_types)
+        self.scores = ScoreBatcher(
+            self._apply_scores, self._retry, batch_size, batch_delay_ms
+        )
 
     async def connect(self):
         self.channel = await self.connection.channel()
+        await self.channel.set_qos(prefetch_count=self.prefetch_count)
         self.exchange = await self.channel.declare_exchange(
             self.exchange_name, aio_pika.ExchangeType.FANOUT, durable=True
         )
-        self.queue = await self.channel.declare_queue(exclusive=True, durable=True)
+        if self.work_queue:
+            await self._declare_dead_letters()
+            self.queue = await self.channel.declare_queue(
+                self.queue_name,
+                durable=True,
+                arguments={
+                    "x-dead-letter-exchange": self.dead_letter_exchange_name,
+                    "x-dead-letter-routing-key": self.queue_name,
+                },
+            )
+            await self._declare_retry_queues()
+            self.broadcast_queue = await self.channel.declare_queue(
+                exclusive=True, auto_delete=True
+            )
+            await self.broadcast_queue.bind(self.exchange)
+        else:
+            self.queue = await self.channel.declare_queue(exclusive=True, durable=True)
         await self.queue.bind(self.exchange)
         if not self.queue:
             raise ConnectionError(
                 f"Failed to declare and bind queue to {self.exchange_name}"
             )
 
+    async def _declare_dead_letters(self):
+        self.dead_letter_exchange = await self.channel.declare_exchange(
+            self.dead_letter_exchange_name, aio_pika.ExchangeType.DIRECT, durable=True
+        )
+        self.dead_letter_queue = await self.channel.declare_queue(
+            f"{self.queue_name}.dead", durable=True
+        )
+        await self.dead_letter_queue.bind(
+            self.dead_letter_exchange, routing_key=self.queue_name
+        )
+
+    async def _declare_retry_queues(self):
+        # Retry queues have no consumers: a message waits out the queue TTL
+        # and is then dead-lettered back onto the work queue, so delayed
+        # retries never hold a consumer slot or prefetch credit.
+        for attempt, delay_ms in enumerate(self.retry_delays, start=1):
+            await self.channel.declare_queue(
+                self.retry_queue_name(attempt),
+                durable=True,
+                arguments={
+                    "x-message-ttl": delay_ms,
+                    "x-dead-letter-exchange": "",
+                    "x-dead-letter-routing-key": self.queue_name,
+                },
+            )
+
+    def retry_queue_name(self, attempt: int) -> str:
+        return f"{self.queue_name}.retry.{attempt}"
+
+    def start(self, app: FastAPI):
+        if self.consume_task is None:
+            self.consume_task = asyncio.create_task(self.consume(app))
+
     async def consume(self, app: FastAPI):
+        self.app = app
+        self.workers.start()
         while True:
             try:
                 if not self.queue:
                     await self.connect()
                 if self.queue:
-                    await self.queue.consume(
+                    self.consumer_tag = await self.queue.consume(
                         lambda message: self._callback(app, message), no_ack=False
                     )
-                    log.info(f"Starting to consume messages from {self.exchange_name}")
+                    if self.broadcast_queue:
+                        self.broadcast_consumer_tag = (
+                            await self.broadcast_queue.consume(
+                                lambda message: self._broadcast_callback(app, message),
+                                no_ack=False,
+                            )
+                        )
+                    log.info(
+                        "Starting to consume messages from %s "
+                        "(queue=%s, prefetch=%s, workers=%s)",
+                        self.exchange_name,
+                        self.queue.name if self.work_queue else "exclusive",
+                        self.prefetch_count,
+                        self.workers.size,
+                    )
                     break
             except (ConnectionClosed, ChannelClosed) as e:
-                log.error(f"Connection closed, retrying... {e}")
+                log.error("Connection closed, retrying... %s", e)
                 await asyncio.sleep(5)
                 await self.connect()
 
     async def _callback(self, app: FastAPI, message: IncomingMessage):
+        try:
+            message_data = decode(message.body, message.content_type)
+        except EventDecodeError as e:
+            log.error("Failed to decode message: %r - Error: %s", message.body, e)
+            consumer_messages.labels("undecodable").inc()
+            await message.reject()
+            return
+        event_type = message_data.get("event_type")
+        if not isinstance(event_type, str):
+            log.error("Rejecting message without a valid event_type: %r", message_data)
+            consumer_messages.labels(OTHER_EVENT_TYPE).inc()
+            await message.reject()
+            return
+        if self.work_queue and event_type in BROADCAST_EVENT_TYPES:
+            # Handled and counted by the broadcast queue.
+            await message.ack()
+            return
+        consumer_messages.labels(event_label(event_type)).inc()
+        if event_type in self.local_event_types and LOCALLY_HANDLED_HEADER in (
+            message.headers or {}
+        ):
+            log.debug("Skipping %s already handled by its publisher", event_type)
+            await message.ack()
+            return
+        if event_type == "score_created":
+            log.debug("Received score_created message")
+            await self.scores.add(message, message_data.get("data"))
+            return
+        await self._submit(app, message, message_data)
+
+    async def _broadcast_callback(self, app: FastAPI, message: IncomingMessage):
         async with message.process():
             try:
-                message_data = json.loads(message.body.decode("utf-8"))
-                log.info(f"Received message: {message_data}")
+                message_data = decode(message.body, message.content_type)
+            except EventDecodeError:
+                return
+            event_type = event_label(message_data.get("event_type"))
+            if event_type in BROADCAST_EVENT_TYPES:
+                consumer_messages.labels(event_type).inc()
+                started = perf_counter()
                 await RatingService.handle_message(app, message_data)
-            except json.JSONDecodeError as e:
-                log.error(
-                    f"Failed to decode message: {message.body.decode('utf-8')} - Error: {e}"
+                consumer_handling_seconds.labels(event_type).observe(
+                    perf_counter() - started
+                )
+
+    async def _apply_scores(self, scores: List[Dict[str, Any]]) -> Set[Tuple[int, int]]:
+        # A score is applied by a single replica in work queue mode, and also
+        # when its publisher handles it locally and the other replicas skip
+        # the tagged copy. That replica tells the others which teams changed.
+        single_replica = self.work_queue or "score_created" in self.local_event_types
+        publisher = self.app.state.publisher if single_replica and self.app else None
+        return await RatingService.apply_scores(scores, publisher)
+
+    async def dispatch_local(self, app: FastAPI, message_data: Dict[str, Any]):
+        self.app = app
+        if message_data["event_type"] == "score_created":
+            await self.scores.add(None, message_data.get("data"))
+            return
+        await self._submit(app, None, message_data)
+
+    async def _submit(
+        self,
+        app: FastAPI,
+        message: Optional[IncomingMessage],
+        message_data: Dict[str, Any],
+    ):
+        consumer_in_flight.labels(event_label(message_data.get("event_type"))).inc()
+        await self.workers.submit(
+            partition_key(message_data),
+            lambda: self._process(app, message, message_data),
+        )
+
+    async def _process(
+        self,
+        app: FastAPI,
+        message: Optional[IncomingMessage],
+        message_data: Dict[str, Any],
+    ):
+        event_type = message_data.get("event_type")
+        log.info(
+            "%s %s message",
+            "Received" if message else "Handling local",
+            event_type,
+        )
+        started = perf_counter()
+        try:
+            await RatingService.handle_message(app, message_data)
+        except Exception as e:
+            log.warning("Error handling message %s: %s", message_data, e)
+            await self._retry(message, message_data)
+            return
+        finally:
+            label = event_label(event_type)
+            consumer_handling_seconds.labels(label).observe(perf_counter() - started)
+            consumer_in_flight.labels(label).dec()
+        if message is not None:
+            await message.ack()
+
+    async def _retry(
+        self, message: Optional[IncomingMessage], message_data: Dict[str, Any]
+    ):
+        """
+        Schedules another attempt through the retry queue for the current
+        attempt, or dead-letters the message once max_attempts is reached.
+        Outside work-queue mode there is nowhere to retry, so the message
+        is discarded.
+        """
+        headers: Dict[str, Any] = dict(message.headers or {}) if message else {}
+        attempts = int(headers.get(ATTEMPTS_HEADER, 1))
+        if not self.work_queue:
+            # Only the work queue has retry queues and a dead-letter exchange.
+            log.error("Discarding message that failed to process: %s", message_data)
+            if message is not None:
+                await message.reject()
+            return
+        if attempts >= self.max_attempts:
+            log.error(
+                "Dead-lettering message after %s attempts: %s", attempts, message_data
+            )
+            if message is not None:
+                await message.reject()
+            else:
+                await self._publish_dead_letter(message_data)
+            return
+        # The retried copy is consumed from the broker, so it must not be
+        # skipped as already handled by the local bus.
+        headers.pop(LOCALLY_HANDLED_HEADER, None)
+        headers[ATTEMPTS_HEADER] = attempts + 1
+        if message is not None:
+            body, content_type = message.body, message.content_type
+        else:
+            body, content_type = encode(message_data)
+        try:
+            if self.channel is None:
+                raise ConnectionError(
+                    "Channel is not initialized. Call connect() first."
                 )
+            await self.channel.default_exchange.publish(
+                aio_pika.Message(
+                    body=body,
+                    content_type=content_type,
+                    headers=headers,
+                    delivery_mode=aio_pika.DeliveryMode.PERSISTENT,
+                ),
+                routing_key=self.retry_queue_name(attempts),
+            )
+        except Exception as e:
+            log.error("Failed to schedule retry for %s: %s", message_data, e)
+            if message is not None:
+                await message.nack(requeue=True)
+            return
+        if message is not None:
+            await message.ack()
+
+    async def _publish_dead_letter(self, message_data: Dict[str, Any]):
+        if self.dead_letter_exchange is None:
+            raise ConnectionError(
+                "Dead letter exchange is not initialized. Call connect() first."
+            )
+        body, content_type = encode(message_data)
+        await self.dead_letter_exchange.publish(
+            aio_pika.Message(
+                body=body,
+                content_type=content_type,
+                delivery_mode=aio_pika.DeliveryMode.PERSISTENT,
+            ),
+            routing_key=self.queue_name,
+        )
+
+    async def replay_dead_letters(self, limit: int) -> int:
+        """
+        Moves up to `limit` dead-lettered messages back onto the work queue
+        with a fresh attempt count.
+        """
+        if not self.work_queue:
+            raise Exception("Dead letters are only kept in work queue mode")
+        if self.channel is None or self.dead_letter_queue is None:
+            raise ConnectionError(
+                "Dead letter queue is not declared. Call connect() first."
+            )
+        replayed = 0
+        while replayed < limit:
+            message = await self.dead_letter_queue.get(no_ack=False, fail=False)
+            if message is None:
+                break
+            headers = {
+                key: value
+                for key, value in (message.headers or {}).items()
+                if key not in (ATTEMPTS_HEADER, LOCALLY_HANDLED_HEADER, "x-death")
+            }
+            await self.channel.default_exchange.publish(
+                aio_pika.Message(
+                    body=message.body,
+                    content_type=message.content_type,
+                    headers=headers,
+                    delivery_mode=aio_pika.DeliveryMode.PERSISTENT,
+                ),
+                routing_key=self.queue_name,
+            )
+            await message.ack()
+            replayed += 1
+        log.info(
+            "Replayed %s dead-lettered messages onto %s", replayed, self.queue_name
+        )
+        return replayed
 
     async def close(self):
+        if self.broadcast_queue and self.broadcast_consumer_tag:
+            await self.broadcast_queue.cancel(self.broadcast_consumer_tag)
+        if self.queue and self.consumer_tag:
+            await self.queue.cancel(self.consumer_tag)
+            await self.workers.join()
+        await self.scores.close()
+        await self.workers.close()
         if self.connection:
             await self.connection.close()
             log.info("Connection closed")
 
 
-async def start_consumer(loop, app: FastAPI) -> Consumer:
+def local_event_types(value: str = settings.LOCAL_EVENT_TYPES) -> set[str]:
+    return {event_type.strip() for event_type in value.split(",") if event_type.strip()}
+
+
+async def start_consumer(loop) -> Consumer:
+    """
+    Connects the consumer and declares its queues. Messages are only
+    consumed once `Consumer.start` is called, after the app is ready.
+    """
     connection = await connect_robust(
         host=settings.BROKER_HOST,
         port=settings.BROKER_PORT,
@@ -81,7 +588,6 @@ async def start_consumer(loop, app: FastAPI) -> Consumer:
         connection_timeout=settings.BROKER_CONNECTION_TIMEOUT,
         attempt_delay=settings.BROKER_ATTEMPT_DELAY,
     )
-    consumer = Consumer(connection)
+    consumer = Consumer(connection, local_event_types=local_event_types())
     await consumer.connect()
-    asyncio.create_task(consumer.consume(app))
     return consumer
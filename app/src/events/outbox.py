@@ -0,0 +1,115 @@
+import asyncio
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Any, Dict, List, Optional, Tuple
+
+from data.session import db
+
+from repository.outbox_repository import OutboxRepository
+
+from events.publisher import Publisher, publish_events
+
+from utils.logger import logger_config
+from utils.config import get_settings
+
+log = logger_config(__name__)
+settings = get_settings()
+
+
+class OutboxRelay:
+    """
+    Background task that publishes the events committed to outbox_events.
+    Each round claims a batch with FOR UPDATE SKIP LOCKED, publishes it with
+    publisher confirms and deletes the confirmed rows in the same
+    transaction, so an event is only dropped from the outbox once the
+    broker has it (delivery is at least once). Relayed events are never
+    dispatched locally: the consumers apply the broker copy.
+    """
+
+    def __init__(
+        self,
+        batch_size: int = settings.OUTBOX_BATCH_SIZE,
+        poll_interval_ms: int = settings.OUTBOX_POLL_INTERVAL_MS,
+    ):
+        self.batch_size = max(1, batch_size)
+        self.poll_interval = poll_interval_ms / 1000
+        self.publisher: Optional[Publisher] = None
+        self.wakeup = asyncio.Event()
+        self.task: Optional[asyncio.Task] = None
+        self.closing = False
+        self.relayed = 0
+
+    def start(self, publisher: Publisher):
+        self.publisher = publisher
+        self.closing = False
+        if self.task is None:
+            self.task = asyncio.create_task(self._run())
+        log.info("Outbox relay started (batch_size=%s)", self.batch_size)
+
+    def wake(self):
+        self.wakeup.set()
+
+    async def _run(self):
+        while not self.closing:
+            try:
+                await asyncio.wait_for(self.wakeup.wait(), timeout=self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+            self.wakeup.clear()
+            try:
+                await self.drain()
+            except Exception as e:
+                log.error("Error relaying outbox events: %s", e)
+
+    async def drain(self) -> int:
+        relayed = 0
+        while True:
+            sent, claimed = await self.relay_once()
+            relayed += sent
+            if claimed < self.batch_size or sent < claimed:
+                return relayed
+
+    async def relay_once(self) -> Tuple[int, int]:
+        if self.publisher is None:
+            raise RuntimeError("Outbox relay has no publisher. Call start() first.")
+        async with db.unit_of_work() as session:
+            events = await OutboxRepository.claim_batch(session, self.batch_size)
+            if not events:
+                return 0, 0
+            messages = [event.to_message() for event in events]
+            confirmed = await self.publisher.publish_confirmed(messages)
+            sent_ids = [int(event.id) for event, ok in zip(events, confirmed) if ok]
+            await OutboxRepository.delete_many(session, sent_ids)
+        self.relayed += len(sent_ids)
+        log.info("Relayed %s/%s outbox events", len(sent_ids), len(events))
+        return len(sent_ids), len(events)
+
+    async def close(self):
+        if self.task is None:
+            return
+        self.closing = True
+        self.wake()
+        await self.task
+        self.task = None
+        try:
+            await self.drain()
+        except Exception as e:
+            log.error("Error relaying outbox events on shutdown: %s", e)
+
+
+outbox_relay = OutboxRelay()
+
+
+async def stage_events(session: AsyncSession, events: List[Tuple[str, Dict[str, Any]]]):
+    """Writes events to the outbox as part of the caller's transaction."""
+    if settings.OUTBOX_ENABLED:
+        await OutboxRepository.add_many(session, events)
+
+
+async def dispatch_events(
+    publisher: Publisher, events: List[Tuple[str, Dict[str, Any]]]
+):
+    """Call after the transaction that staged `events` has committed."""
+    if settings.OUTBOX_ENABLED:
+        outbox_relay.wake()
+    elif events:
+        await publish_events(publisher, events)
@@ -1,57 +1,185 @@
 import aio_pika  # type: ignore
 from aio_pika import ExchangeType, connect_robust
-import json
-from datetime import datetime
-from typing import Any, Dict
+import asyncio
+from time import perf_counter
+from typing import Any, Dict, List, Optional, Tuple
+
+from events.codec import encode, get_codec
 
 from utils.logger import logger_config
 from utils.config import get_settings
+from utils.metrics import (
+    publisher_failures,
+    publisher_messages,
+    publisher_publish_seconds,
+)
 
 log = logger_config(__name__)
 settings = get_settings()
 
 
-class DateTimeEncoder(json.JSONEncoder):
-    def default(self, obj: Any) -> str:
-        if isinstance(obj, datetime):
-            return obj.isoformat()
-        return super().default(obj)
-
-
 class Publisher:
     def __init__(
         self,
         connection: aio_pika.RobustConnection,
         exchange_name: str = settings.EXCHANGE_NAME,
+        buffered: bool = settings.PUBLISHER_BUFFERED,
+        batch_size: int = settings.PUBLISHER_BATCH_SIZE,
+        flush_interval_ms: int = settings.PUBLISHER_FLUSH_INTERVAL_MS,
+        codec: str = settings.EVENT_CODEC,
     ):
         self.exchange_name = exchange_name
+        self.codec = get_codec(codec)
         self.connection = connection
         self.channel = None
         self.exchange = None
+        self.buffered = buffered
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = flush_interval_ms / 1000
+        self.buffer: List[aio_pika.Message] = []
+        self.flush_lock = asyncio.Lock()
+        self.flush_requested = asyncio.Event()
+        self.flush_task: Optional[asyncio.Task] = None
+        self.closing = False
+        self.published = 0
+        self.nacked = 0
 
     async def connect(self):
-        self.channel = await self.connection.channel()
+        self.channel = await self.connection.channel(publisher_confirms=True)
         await self._declare_exchange()
-        log.info(f"Connected to exchange {self.exchange_name}")
+        if self.buffered and self.flush_task is None:
+            self.flush_task = asyncio.create_task(self._flush_periodically())
+        log.info("Connected to exchange %s", self.exchange_name)
 
     async def _declare_exchange(self):
         self.exchange = await self.channel.declare_exchange(
             self.exchange_name, ExchangeType.FANOUT, durable=True
         )
 
-    async def publish(self, message: Dict[str, Any]):
+    async def publish(
+        self, message: Dict[str, Any], headers: Optional[Dict[str, Any]] = None
+    ):
+        if not self.exchange:
+            raise ConnectionError("Exchange is not initialized. Call connect() first.")
+        body, content_type = encode(message, self.codec)
+        amqp_message = aio_pika.Message(
+            body=body, content_type=content_type, headers=headers
+        )
+        if self.buffered:
+            self.buffer.append(amqp_message)
+            if len(self.buffer) >= self.batch_size:
+                self.flush_requested.set()
+            return
+        started = perf_counter()
+        try:
+            await self.exchange.publish(amqp_message, routing_key="")
+        except Exception:
+            publisher_failures.inc()
+            raise
+        finally:
+            publisher_publish_seconds.observe(perf_counter() - started)
+        self.published += 1
+        publisher_messages.inc()
+        log.debug(
+            "Published %s message to exchange %s",
+            message.get("event_type"),
+            self.exchange_name,
+        )
+
+    async def flush(self):
+        async with self.flush_lock:
+            while self.buffer:
+                batch = self.buffer[: self.batch_size]
+                del self.buffer[: self.batch_size]
+                await self._publish_batch(batch)
+
+    async def publish_confirmed(
+        self,
+        messages: List[Dict[str, Any]],
+        headers: Optional[List[Optional[Dict[str, Any]]]] = None,
+    ) -> List[bool]:
+        """
+        Publishes `messages` immediately, bypassing the buffer, and returns
+        whether the broker confirmed each one.
+        """
+        if not self.exchange:
+            raise ConnectionError("Exchange is not initialized. Call connect() first.")
+        headers = headers or [None] * len(messages)
+        amqp_messages = []
+        for message, message_headers in zip(messages, headers):
+            body, content_type = encode(message, self.codec)
+            amqp_messages.append(
+                aio_pika.Message(
+                    body=body, content_type=content_type, headers=message_headers
+                )
+            )
+        confirmed: List[bool] = []
+        for start in range(0, len(amqp_messages), self.batch_size):
+            confirmed.extend(
+                await self._publish_batch(
+                    amqp_messages[start : start + self.batch_size]
+                )
+            )
+        return confirmed
+
+    async def _publish_batch(self, batch: List[aio_pika.Message]) -> List[bool]:
         if not self.exchange:
             raise ConnectionError("Exchange is not initialized. Call connect() first.")
-        await self.exchange.publish(
-            aio_pika.Message(body=json.dumps(message, cls=DateTimeEncoder).encode()),
-            routing_key="",
+        started = perf_counter()
+        results = await asyncio.gather(
+            *(self.exchange.publish(message, routing_key="") for message in batch),
+            return_exceptions=True,
         )
-        log.info(f"Published message to exchange {self.exchange_name}: {message}")
+        publisher_publish_seconds.observe(perf_counter() - started)
+        failed = [
+            (message, result)
+            for message, result in zip(batch, results)
+            if isinstance(result, BaseException)
+        ]
+        self.published += len(batch) - len(failed)
+        self.nacked += len(failed)
+        publisher_messages.inc(len(batch) - len(failed))
+        publisher_failures.inc(len(failed))
+        for message, error in failed:
+            log.error(
+                "Message not confirmed by exchange %s: %r - Error: %r",
+                self.exchange_name,
+                message.body,
+                error,
+            )
+        log.info(
+            "Published %s/%s buffered messages to exchange %s",
+            len(batch) - len(failed),
+            len(batch),
+            self.exchange_name,
+        )
+        return [not isinstance(result, BaseException) for result in results]
+
+    async def _flush_periodically(self):
+        while not self.closing:
+            try:
+                await asyncio.wait_for(
+                    self.flush_requested.wait(), timeout=self.flush_interval
+                )
+            except asyncio.TimeoutError:
+                pass
+            self.flush_requested.clear()
+            try:
+                await self.flush()
+            except Exception as e:
+                log.error("Error flushing messages to %s: %s", self.exchange_name, e)
 
     async def close(self):
+        if self.flush_task:
+            self.closing = True
+            self.flush_requested.set()
+            await self.flush_task
+            self.flush_task = None
+        if self.buffer and self.exchange:
+            await self.flush()
         if self.connection:
             await self.connection.close()
-            log.info(f"Connection to exchange {self.exchange_name} closed")
+            log.info("Connection to exchange %s closed", self.exchange_name)
 
 
 async def start_publisher(loop):
@@ -75,3 +203,15 @@ async def publish_event(
     event = {"event_type": event_type, "data": data}
     await publisher.publish(event)
     return True
+
+
+async def publish_events(
+    publisher: Publisher, events: List[Tuple[str, Dict[str, Any]]]
+) -> bool:
+    await asyncio.gather(
+        *(
+            publisher.publish({"event_type": event_type, "data": data})
+            for event_type, data in events
+        )
+    )
+    return True
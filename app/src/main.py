@@ -1,18 +1,32 @@
 import uvicorn
 import asyncio
 from contextlib import asynccontextmanager
+from time import perf_counter
+from typing import Awaitable, Dict, Optional, TypeVar, Union
 
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 
-from data.sample import insert_sample_scores, insert_sample_player_ratings
+from data.sample import (
+    insert_sample_scores,
+    insert_sample_player_ratings,
+)
+from data.migrations import build_indexes_in_background, migrate
 from data.session import db
 
+from events.bus import LocalEventBus
 from events.consumer import Consumer, start_consumer
+from events.outbox import outbox_relay
 from events.publisher import Publisher, start_publisher
 
+from resolver.dataloader import get_loaders
+
+from service.daily_scores_pruner import daily_scores_pruner
+
+from routes.admin_router import admin_router
 from routes.graphql_router import graphql_app, graphql_router
 from routes.health_router import health_router
+from routes.metrics_router import metrics_router
 
 from utils.logger import logger_config
 
@@ -21,28 +35,101 @@ from utils.config import get_settings
 log = logger_config(__name__)
 settings = get_settings()
 
+T = TypeVar("T")
+
+
+async def timed(timings: Dict[str, float], name: str, step: Awaitable[T]) -> T:
+    started = perf_counter()
+    try:
+        return await step
+    finally:
+        timings[name] = (perf_counter() - started) * 1000
+
+
+async def init_database():
+    await migrate(db.engine)
+    async with db.get_db() as session:
+        await insert_sample_player_ratings(session)
+        await insert_sample_scores(session)
+
 
 @asynccontextmanager
-async def lifespan(app: FastAPI):
-    loop = asyncio.get_event_loop()
-    consumer: Consumer = await start_consumer(loop, app)
-    publisher: Publisher = await start_publisher(loop)
+async def running(app: FastAPI, consumer: Consumer, publisher: Publisher):
+    """
+    Wires connected broker clients into the app, starts consuming, relaying,
+    pruning and building indexes, and shuts them down in order on exit.
+    """
     app.state.consumer = consumer
     app.state.publisher = publisher
+    if consumer.local_event_types:
+        app.state.publisher = LocalEventBus(
+            publisher, consumer, app, consumer.local_event_types
+        )
+    indexes = asyncio.create_task(build_indexes_in_background(db.engine))
     try:
-        await db.create_database()
-        async with db.get_db() as session:
-            await insert_sample_player_ratings(session)
-            await insert_sample_scores(session)
+        if settings.OUTBOX_ENABLED:
+            outbox_relay.start(app.state.publisher)
+        consumer.start(app)
+        daily_scores_pruner.start()
         yield
     finally:
+        # An interrupted build leaves an invalid index, which the next
+        # start drops and builds again.
+        indexes.cancel()
+        await asyncio.gather(indexes, return_exceptions=True)
+        # The relay's final drain publishes to the broker, so it runs while
+        # the consumer can still take those events off the queue.
+        await daily_scores_pruner.close()
+        await outbox_relay.close()
         await consumer.close()
         await publisher.close()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    loop = asyncio.get_event_loop()
+    timings: Dict[str, float] = {}
+    started = perf_counter()
+    # Broker connections and database initialization are independent, so
+    # they are brought up concurrently.
+    consumer: Union[Consumer, BaseException]
+    publisher: Union[Publisher, BaseException]
+    database: Optional[BaseException]
+    consumer, publisher, database = await asyncio.gather(
+        timed(timings, "consumer", start_consumer(loop)),
+        timed(timings, "publisher", start_publisher(loop)),
+        timed(timings, "database", init_database()),
+        return_exceptions=True,
+    )
+    if (
+        isinstance(consumer, BaseException)
+        or isinstance(publisher, BaseException)
+        or isinstance(database, BaseException)
+    ):
+        for step in (consumer, publisher):
+            if not isinstance(step, BaseException):
+                await step.close()
+        await db.close_database()
+        raise next(
+            step
+            for step in (consumer, publisher, database)
+            if isinstance(step, BaseException)
+        )
+
+    try:
+        async with running(app, consumer, publisher):
+            log.info(
+                "Startup finished in %.0f ms (%s)",
+                (perf_counter() - started) * 1000,
+                ", ".join(f"{name}: {ms:.0f} ms" for name, ms in timings.items()),
+            )
+            yield
+    finally:
         await db.close_database()
 
 
 async def get_context(request: Request) -> dict:
-    return {"publisher": request.app.state.publisher}
+    return {"publisher": request.app.state.publisher, **get_loaders()}
 
 
 def init_app():
@@ -93,6 +180,8 @@ def init_app():
 
     app.router.lifespan_context = lifespan
     app.include_router(health_router)
+    app.include_router(metrics_router)
+    app.include_router(admin_router)
     app.include_router(graphql_router)
     app.include_router(graphql_app(get_context), prefix=settings.API_PREFIX)
 
@@ -104,4 +193,4 @@ def init_app():
 app = init_app()
 
 if __name__ == "__main__":
-    uvicorn.run(app, host=settings.APP_HOST, port=settings.APP_PORT, reload=True)
+    uvicorn.run(app, host=settings.APP_HOST, port=int(settings.APP_PORT), reload=True)
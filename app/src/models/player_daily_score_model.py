@@ -0,0 +1,30 @@
+from datetime import date
+
+from sqlalchemy import BigInteger, Date, Index, Integer
+from sqlalchemy.orm import Mapped, mapped_column
+
+from data.session import Base
+
+
+class PlayerDailyScore(Base):
+    __tablename__ = "player_daily_scores"
+
+    team_id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=False)
+    player_id: Mapped[int] = mapped_column(
+        Integer, primary_key=True, autoincrement=False
+    )
+    day: Mapped[date] = mapped_column(Date, primary_key=True)
+    score_sum: Mapped[int] = mapped_column(BigInteger, nullable=False)
+    score_count: Mapped[int] = mapped_column(Integer, nullable=False)
+
+    def to_dict(self):
+        return {
+            "team_id": self.team_id,
+            "player_id": self.player_id,
+            "day": self.day.isoformat() if self.day else None,
+            "score_sum": self.score_sum,
+            "score_count": self.score_count,
+        }
+
+
+Index("ix_player_daily_scores_day", PlayerDailyScore.day)
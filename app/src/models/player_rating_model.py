@@ -1,6 +1,8 @@
-from sqlalchemy import Column, Integer, Float, DateTime
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, Integer, Float, DateTime, Index
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.orm import Mapped, mapped_column, relationship
 from datetime import datetime, timezone
+from typing import List
 
 from data.session import Base
 
@@ -8,10 +10,15 @@ from data.session import Base
 class PlayerRating(Base):
     __tablename__ = "player_ratings"
 
-    player_id = Column(Integer, primary_key=True, autoincrement=True)
-    team_id = Column(Integer)
+    team_id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=False)
+    player_id: Mapped[int] = mapped_column(
+        Integer, primary_key=True, autoincrement=False
+    )
     average_score = Column(Float)
     total_of_scores = Column(Integer)
+    recent_scores: Mapped[List[int]] = mapped_column(
+        ARRAY(Integer), nullable=False, default=list
+    )
     last_updated = Column(
         DateTime(timezone=True), default=lambda: datetime.now(timezone.utc)
     )
@@ -23,7 +30,16 @@ class PlayerRating(Base):
             "team_id": self.team_id,
             "average_score": self.average_score,
             "total_of_scores": self.total_of_scores,
+            "recent_scores": self.recent_scores,
             "last_updated": self.last_updated.isoformat()
             if self.last_updated
             else None,
         }
+
+
+Index(
+    "ix_player_ratings_team_id_average_score",
+    PlayerRating.team_id,
+    PlayerRating.average_score.desc(),
+    PlayerRating.player_id.desc(),
+)
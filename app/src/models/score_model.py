@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, DateTime, ForeignKeyConstraint, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime, timezone
 
@@ -7,9 +7,22 @@ from data.session import Base
 
 class Score(Base):
     __tablename__ = "scores"
+    __table_args__ = (
+        ForeignKeyConstraint(
+            ["team_id", "player_id"],
+            ["player_ratings.team_id", "player_ratings.player_id"],
+        ),
+        Index("ix_scores_player_id_created_at", "player_id", "created_at"),
+        Index(
+            "ix_scores_team_id_player_id_created_at",
+            "team_id",
+            "player_id",
+            "created_at",
+        ),
+    )
 
     score_id = Column(Integer, primary_key=True, autoincrement=True)
-    player_id = Column(Integer, ForeignKey("player_ratings.player_id"))
+    player_id = Column(Integer)
     team_id = Column(Integer)
     score = Column(Integer)
     created_at = Column(
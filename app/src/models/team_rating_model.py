@@ -0,0 +1,29 @@
+from sqlalchemy import Column, Integer, Float, DateTime
+from datetime import datetime, timezone
+
+from data.session import Base
+
+
+class TeamRating(Base):
+    __tablename__ = "team_ratings"
+
+    team_id = Column(Integer, primary_key=True, autoincrement=False)
+    player_count = Column(Integer, nullable=False, default=0)
+    score_sum = Column(Float, nullable=False, default=0)
+    score_count = Column(Integer, nullable=False, default=0)
+    average_score = Column(Float)
+    last_updated = Column(
+        DateTime(timezone=True), default=lambda: datetime.now(timezone.utc)
+    )
+
+    def to_dict(self):
+        return {
+            "team_id": self.team_id,
+            "player_count": self.player_count,
+            "score_sum": self.score_sum,
+            "score_count": self.score_count,
+            "average_score": self.average_score,
+            "last_updated": self.last_updated.isoformat()
+            if self.last_updated
+            else None,
+        }
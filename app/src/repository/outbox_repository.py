@@ -0,0 +1,51 @@
+from typing import Any, Dict, List, Tuple
+from sqlalchemy import BigInteger, any_, bindparam, delete, insert
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select as sql_select
+from models.outbox_event_model import OutboxEvent
+from utils.logger import logger_config
+from utils.metrics import repository_call_seconds, timed_methods
+
+log = logger_config(__name__)
+
+
+@timed_methods(repository_call_seconds)
+class OutboxRepository:
+    @staticmethod
+    async def add_many(
+        session: AsyncSession, events: List[Tuple[str, Dict[str, Any]]]
+    ) -> None:
+        if not events:
+            return
+        await session.execute(
+            insert(OutboxEvent),
+            [
+                {"event_type": event_type, "payload": data}
+                for event_type, data in events
+            ],
+        )
+
+    @staticmethod
+    async def claim_batch(session: AsyncSession, limit: int) -> List[OutboxEvent]:
+        # Rows locked by another relay are skipped, so replicas drain
+        # disjoint batches instead of waiting on each other.
+        stmt = (
+            sql_select(OutboxEvent)
+            .order_by(OutboxEvent.id)
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+        )
+        result = await session.execute(stmt)
+        return list(result.scalars().all())
+
+    @staticmethod
+    async def delete_many(session: AsyncSession, ids: List[int]) -> None:
+        if not ids:
+            return
+        stmt = (
+            delete(OutboxEvent)
+            .where(OutboxEvent.id == any_(bindparam("ids", type_=ARRAY(BigInteger))))
+            .execution_options(synchronize_session=False)
+        )
+        await session.execute(stmt, {"ids": ids})
@@ -0,0 +1,135 @@
+from datetime import date
+from typing import Any, Dict, Mapping, Optional, Sequence, Tuple, cast
+from sqlalchemy import (
+    CursorResult,
+    Integer,
+    Row,
+    any_,
+    bindparam,
+    delete,
+    func,
+)
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select as sql_select
+from models.player_daily_score_model import PlayerDailyScore
+from utils.logger import logger_config
+from utils.metrics import repository_call_seconds, timed_methods
+
+log = logger_config(__name__)
+
+
+@timed_methods(repository_call_seconds)
+class PlayerDailyScoreRepository:
+    @staticmethod
+    async def add_scores(
+        session: AsyncSession,
+        day: date,
+        deltas: Sequence[Mapping[str, Any]],
+    ) -> None:
+        buckets: Dict[Tuple[int, int], Dict[str, Any]] = {}
+        for d in deltas:
+            bucket = buckets.setdefault(
+                (d["team_id"], d["player_id"]),
+                {
+                    "team_id": d["team_id"],
+                    "player_id": d["player_id"],
+                    "day": day,
+                    "score_sum": 0,
+                    "score_count": 0,
+                },
+            )
+            bucket["score_sum"] += d["score_sum"]
+            bucket["score_count"] += d["score_count"]
+        if not buckets:
+            return
+        # Upserted in key order so concurrent batches lock shared buckets in
+        # the same order.
+        stmt = pg_insert(PlayerDailyScore).values(
+            [buckets[key] for key in sorted(buckets)]
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[
+                PlayerDailyScore.team_id,
+                PlayerDailyScore.player_id,
+                PlayerDailyScore.day,
+            ],
+            set_={
+                "score_sum": PlayerDailyScore.score_sum + stmt.excluded.score_sum,
+                "score_count": PlayerDailyScore.score_count + stmt.excluded.score_count,
+            },
+        )
+        await session.execute(stmt)
+
+    @staticmethod
+    async def get_window_totals(
+        session: AsyncSession,
+        team_ids: list[int],
+        since: date,
+        player_ids: Optional[list[int]] = None,
+    ) -> Sequence[Row]:
+        stmt = (
+            sql_select(
+                PlayerDailyScore.team_id,
+                PlayerDailyScore.player_id,
+                func.sum(PlayerDailyScore.score_sum).label("score_sum"),
+                func.sum(PlayerDailyScore.score_count).label("score_count"),
+            )
+            .where(
+                PlayerDailyScore.team_id
+                == any_(bindparam("team_ids", team_ids, type_=ARRAY(Integer))),
+                PlayerDailyScore.day >= since,
+            )
+            .group_by(PlayerDailyScore.team_id, PlayerDailyScore.player_id)
+        )
+        if player_ids is not None:
+            stmt = stmt.where(
+                PlayerDailyScore.player_id
+                == any_(bindparam("player_ids", player_ids, type_=ARRAY(Integer)))
+            )
+        result = await session.execute(stmt)
+        return result.all()
+
+    @staticmethod
+    async def delete_by_team_id(session: AsyncSession, team_id: int) -> None:
+        await session.execute(
+            delete(PlayerDailyScore)
+            .where(PlayerDailyScore.team_id == team_id)
+            .execution_options(synchronize_session=False)
+        )
+
+    @staticmethod
+    async def replace_many(
+        session: AsyncSession, buckets: list[Dict[str, Any]]
+    ) -> None:
+        """Inserts or overwrites the given buckets, e.g. after a rebuild."""
+        if not buckets:
+            return
+        stmt = pg_insert(PlayerDailyScore).values(buckets)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[
+                PlayerDailyScore.team_id,
+                PlayerDailyScore.player_id,
+                PlayerDailyScore.day,
+            ],
+            set_={
+                "score_sum": stmt.excluded.score_sum,
+                "score_count": stmt.excluded.score_count,
+            },
+        )
+        await session.execute(stmt)
+
+    @staticmethod
+    async def prune(session: AsyncSession, before: date) -> int:
+        result = cast(
+            CursorResult[Any],
+            await session.execute(
+                delete(PlayerDailyScore)
+                .where(PlayerDailyScore.day < before)
+                .execution_options(synchronize_session=False)
+            ),
+        )
+        if result.rowcount:
+            log.info("Pruned %s daily score buckets before %s", result.rowcount, before)
+        return result.rowcount
@@ -1,53 +1,308 @@
-from typing import Optional
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Sequence, Tuple, TypedDict
+from sqlalchemy import (
+    Integer,
+    Row,
+    Select,
+    any_,
+    bindparam,
+    column,
+    func,
+    tuple_,
+    values,
+)
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy import update as sql_update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select as sql_select
+from sqlalchemy.sql.dml import ReturningInsert
 from models.player_rating_model import PlayerRating
-from data.session import db
 from utils.logger import logger_config
+from utils.metrics import repository_call_seconds, timed_methods
 
 log = logger_config(__name__)
 
 
+class ScoreDelta(TypedDict):
+    """Scores added to one player's rating, folded from a batch of events."""
+
+    player_id: int
+    team_id: int
+    score_sum: int
+    score_count: int
+    scores: List[int]
+
+
+@timed_methods(repository_call_seconds)
 class PlayerRatingRepository:
     @staticmethod
-    async def create(player_rating: PlayerRating) -> PlayerRating:
-        async with db.get_db() as session:
-            async with db.commit_rollback(session):
-                session.add(player_rating)
-                await session.flush()
-                await session.refresh(player_rating)
-                log.info(f"Player rating created in repository: {player_rating}")
+    async def create(
+        session: AsyncSession, player_rating: PlayerRating
+    ) -> PlayerRating:
+        session.add(player_rating)
+        await session.flush()
+        await session.refresh(player_rating)
+        log.info(
+            "Player rating created in repository for player_id: %s and team_id: %s",
+            player_rating.player_id,
+            player_rating.team_id,
+        )
         return player_rating
 
+    @staticmethod
+    async def create_missing(
+        session: AsyncSession, player_ratings: list[Dict[str, Any]]
+    ) -> list[int]:
+        if not player_ratings:
+            return []
+        stmt: ReturningInsert[int] = (
+            pg_insert(PlayerRating)
+            .values(
+                sorted(player_ratings, key=lambda r: (r["team_id"], r["player_id"]))
+            )
+            .on_conflict_do_nothing(
+                index_elements=[PlayerRating.team_id, PlayerRating.player_id]
+            )
+            .returning(PlayerRating.player_id)
+        )
+        result = await session.execute(stmt)
+        created = list(result.scalars().all())
+        log.info("%s player ratings created in repository", len(created))
+        return created
+
     @staticmethod
     async def get_rating_by_player_id(
-        player_id: int, team_id: int
+        session: AsyncSession, player_id: int, team_id: int
     ) -> Optional[PlayerRating]:
-        async with db.get_db() as session:
-            stmt = sql_select(PlayerRating).where(
-                PlayerRating.player_id == player_id, PlayerRating.team_id == team_id
-            )
-            result = await session.execute(stmt)
-            player_rating = result.scalars().first()
-            if player_rating:
-                log.info(f"Player rating found in repository: {player_rating}")
+        stmt = sql_select(PlayerRating).where(
+            PlayerRating.player_id == player_id, PlayerRating.team_id == team_id
+        )
+        result = await session.execute(stmt)
+        player_rating = result.scalars().first()
+        if player_rating:
+            log.debug(
+                "Player rating found in repository for player_id: %s and team_id: %s",
+                player_rating.player_id,
+                player_rating.team_id,
+            )
         return player_rating
 
     @staticmethod
-    async def get_players_by_team_id(team_id: int) -> list[PlayerRating]:
-        async with db.get_db() as session:
-            stmt = sql_select(PlayerRating).where(PlayerRating.team_id == team_id)
-            result = await session.execute(stmt)
-            player_ratings = result.scalars().all()
-            if player_ratings:
-                log.info(f"Players ratings found in repository: {player_ratings}")
+    async def get_players_by_team_id(
+        session: AsyncSession, team_id: int
+    ) -> list[PlayerRating]:
+        stmt = sql_select(PlayerRating).where(PlayerRating.team_id == team_id)
+        result = await session.execute(stmt)
+        player_ratings = result.scalars().all()
+        if player_ratings:
+            log.debug(
+                "%s players ratings found in repository for team %s",
+                len(player_ratings),
+                team_id,
+            )
+        return list(player_ratings)
+
+    @staticmethod
+    async def get_players_by_team_ids(
+        session: AsyncSession, team_ids: list[int]
+    ) -> list[PlayerRating]:
+        stmt = sql_select(PlayerRating).where(
+            PlayerRating.team_id
+            == any_(bindparam("team_ids", team_ids, type_=ARRAY(Integer)))
+        )
+        result = await session.execute(stmt)
+        player_ratings = result.scalars().all()
+        log.info(
+            "%s players ratings found in repository for teams %s",
+            len(player_ratings),
+            team_ids,
+        )
         return list(player_ratings)
 
     @staticmethod
-    async def update(player_rating: PlayerRating) -> PlayerRating:
-        async with db.get_db() as session:
-            async with db.commit_rollback(session):
-                session.add(player_rating)
-                await session.flush()
-                await session.refresh(player_rating)
-                log.info(f"Player rating updated in repository: {player_rating}")
+    async def get_team_ids(session: AsyncSession) -> list[int]:
+        stmt = (
+            sql_select(PlayerRating.team_id).distinct().order_by(PlayerRating.team_id)
+        )
+        result = await session.execute(stmt)
+        return list(result.scalars().all())
+
+    @staticmethod
+    async def lock_team(session: AsyncSession, team_id: int) -> None:
+        """Locks the team's rating rows until the end of the transaction."""
+        stmt = (
+            sql_select(PlayerRating.player_id)
+            .where(PlayerRating.team_id == team_id)
+            .order_by(PlayerRating.player_id)
+            .with_for_update()
+        )
+        await session.execute(stmt)
+
+    @staticmethod
+    async def replace_many(
+        session: AsyncSession, player_ratings: list[Dict[str, Any]]
+    ) -> None:
+        """Inserts or overwrites the given ratings, e.g. after a rebuild."""
+        if not player_ratings:
+            return
+        stmt = pg_insert(PlayerRating).values(player_ratings)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[PlayerRating.team_id, PlayerRating.player_id],
+            set_={
+                "average_score": stmt.excluded.average_score,
+                "total_of_scores": stmt.excluded.total_of_scores,
+                "recent_scores": stmt.excluded.recent_scores,
+                "last_updated": stmt.excluded.last_updated,
+            },
+        )
+        await session.execute(stmt)
+
+    @staticmethod
+    async def get_rating_columns(
+        session: AsyncSession, team_id: Optional[int] = None
+    ) -> Tuple[Sequence[int], Sequence[int], Sequence[float]]:
+        """
+        Returns team ids, player ids and average scores of every rated player
+        (or only those of `team_id`) as three parallel lists, aggregated
+        server side in a single row.
+        """
+        stmt: Select[Sequence[int], Sequence[int], Sequence[float]] = sql_select(
+            func.array_agg(PlayerRating.team_id),
+            func.array_agg(PlayerRating.player_id),
+            func.array_agg(PlayerRating.average_score),
+        ).where(PlayerRating.average_score.is_not(None))
+        if team_id is not None:
+            stmt = stmt.where(PlayerRating.team_id == team_id)
+        team_ids, player_ids, average_scores = (await session.execute(stmt)).one()
+        return team_ids or [], player_ids or [], average_scores or []
+
+    @staticmethod
+    async def get_players_page(
+        session: AsyncSession,
+        team_id: int,
+        order_by: str,
+        limit: int,
+        after: Optional[Tuple[float, int]] = None,
+    ) -> Sequence[Row]:
+        stmt: Select[int, float, list[int]] = sql_select(
+            PlayerRating.player_id,
+            PlayerRating.average_score,
+            PlayerRating.recent_scores,
+        ).where(PlayerRating.team_id == team_id)
+        if order_by == "average_score":
+            if after is not None:
+                stmt = stmt.where(
+                    tuple_(PlayerRating.average_score, PlayerRating.player_id)
+                    < tuple_(*after)
+                )
+            stmt = stmt.order_by(
+                PlayerRating.average_score.desc(), PlayerRating.player_id.desc()
+            )
+        else:
+            if after is not None:
+                stmt = stmt.where(PlayerRating.player_id > after[1])
+            stmt = stmt.order_by(PlayerRating.player_id)
+        result = await session.execute(stmt.limit(limit))
+        return result.all()
+
+    @staticmethod
+    async def add_score(
+        session: AsyncSession,
+        player_id: int,
+        team_id: int,
+        score: int,
+        window_size: int,
+    ) -> Optional[PlayerRating]:
+        stmt = (
+            sql_update(PlayerRating)
+            .where(PlayerRating.player_id == player_id, PlayerRating.team_id == team_id)
+            .values(
+                average_score=(
+                    PlayerRating.average_score * PlayerRating.total_of_scores + score
+                )
+                / (PlayerRating.total_of_scores + 1),
+                total_of_scores=PlayerRating.total_of_scores + 1,
+                recent_scores=func.append_window(
+                    PlayerRating.recent_scores,
+                    bindparam("new_scores", [score], type_=ARRAY(Integer)),
+                    window_size,
+                ),
+                last_updated=datetime.now(timezone.utc),
+            )
+            .returning(PlayerRating)
+        )
+        result = await session.execute(stmt)
+        player_rating = result.scalars().first()
+        if player_rating:
+            log.debug(
+                "Player rating updated in repository for player_id: %s and team_id: %s",
+                player_rating.player_id,
+                player_rating.team_id,
+            )
         return player_rating
+
+    @staticmethod
+    async def add_score_deltas(
+        session: AsyncSession, deltas: list[ScoreDelta], window_size: int
+    ) -> list[PlayerRating]:
+        if not deltas:
+            return []
+        deltas = sorted(deltas, key=lambda d: (d["team_id"], d["player_id"]))
+        # UPDATE ... FROM VALUES locks rows in whatever order the join
+        # produces, so the rows are locked in key order first. Concurrent
+        # batches sharing players then wait on each other instead of
+        # deadlocking.
+        await session.execute(
+            sql_select(PlayerRating.player_id)
+            .where(
+                tuple_(PlayerRating.team_id, PlayerRating.player_id).in_(
+                    [(d["team_id"], d["player_id"]) for d in deltas]
+                )
+            )
+            .order_by(PlayerRating.team_id, PlayerRating.player_id)
+            .with_for_update()
+        )
+        delta = values(
+            column("player_id", Integer),
+            column("team_id", Integer),
+            column("score_sum", Integer),
+            column("score_count", Integer),
+            column("scores", ARRAY(Integer)),
+            name="delta",
+        ).data(
+            [
+                (
+                    d["player_id"],
+                    d["team_id"],
+                    d["score_sum"],
+                    d["score_count"],
+                    d["scores"][-window_size:],
+                )
+                for d in deltas
+            ]
+        )
+        stmt = (
+            sql_update(PlayerRating)
+            .where(
+                PlayerRating.player_id == delta.c.player_id,
+                PlayerRating.team_id == delta.c.team_id,
+            )
+            .values(
+                average_score=(
+                    PlayerRating.average_score * PlayerRating.total_of_scores
+                    + delta.c.score_sum
+                )
+                / (PlayerRating.total_of_scores + delta.c.score_count),
+                total_of_scores=PlayerRating.total_of_scores + delta.c.score_count,
+                recent_scores=func.append_window(
+                    PlayerRating.recent_scores, delta.c.scores, window_size
+                ),
+                last_updated=datetime.now(timezone.utc),
+            )
+            .returning(PlayerRating)
+        )
+        result = await session.execute(stmt)
+        player_ratings = list(result.scalars().all())
+        log.info("%s player ratings updated in repository", len(player_ratings))
+        return player_ratings
@@ -1,30 +1,62 @@
-from typing import Optional
+from datetime import datetime
+from typing import Any, AsyncIterator, Dict, Optional, Sequence
+from sqlalchemy import Row, Select, insert
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select as sql_select
 from models.score_model import Score
-from data.session import db
 from utils.logger import logger_config
+from utils.metrics import repository_call_seconds, timed_methods
 
 log = logger_config(__name__)
 
 
+@timed_methods(repository_call_seconds)
 class ScoreRepository:
     @staticmethod
-    async def create(score: Score) -> Score:
-        async with db.get_db() as session:
-            async with db.commit_rollback(session):
-                session.add(score)
-                await session.flush()
-                await session.refresh(score)
-                log.info(f"Score created in repository: {score}")
+    async def create(session: AsyncSession, score: Score) -> Score:
+        session.add(score)
+        await session.flush()
+        await session.refresh(score)
+        log.debug("Score %s created in repository", score.score_id)
         return score
 
     @staticmethod
-    async def get_by_player_id(player_id: int) -> Optional[Score]:
-        async with db.get_db() as session:
-            stmt = sql_select(Score).where(Score.player_id == player_id)
-            result = await session.execute(stmt)
-            score = result.scalars().first()
-            if score:
-                await session.refresh(score)
-                log.info(f"Score retrieved from repository: {score}")
+    async def create_many(
+        session: AsyncSession, scores: list[Dict[str, Any]]
+    ) -> list[Score]:
+        if not scores:
+            return []
+        stmt = insert(Score).values(scores).returning(Score)
+        result = await session.execute(stmt)
+        created = list(result.scalars().all())
+        log.info("%s scores created in repository", len(created))
+        return created
+
+    @staticmethod
+    async def stream_by_team_id(
+        session: AsyncSession, team_id: int, chunk_size: int
+    ) -> AsyncIterator[Sequence[Row]]:
+        """
+        Yields the team's scores ordered by player and time in chunks of
+        chunk_size, read through a server-side cursor.
+        """
+        stmt: Select[int, int, datetime] = (
+            sql_select(Score.player_id, Score.score, Score.created_at)
+            .where(Score.team_id == team_id)
+            .order_by(Score.player_id, Score.created_at)
+            .execution_options(yield_per=chunk_size)
+        )
+        result = await session.stream(stmt)
+        async for chunk in result.partitions():
+            yield chunk
+
+    @staticmethod
+    async def get_by_player_id(
+        session: AsyncSession, player_id: int
+    ) -> Optional[Score]:
+        stmt = sql_select(Score).where(Score.player_id == player_id)
+        result = await session.execute(stmt)
+        score = result.scalars().first()
+        if score:
+            log.info("Score retrieved from repository: %s", score)
         return score
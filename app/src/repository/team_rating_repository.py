@@ -0,0 +1,112 @@
+from datetime import datetime, timezone
+from typing import Dict, Optional, Union
+from sqlalchemy import ColumnElement, func
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select as sql_select
+from models.player_rating_model import PlayerRating
+from models.team_rating_model import TeamRating
+from utils.logger import logger_config
+from utils.metrics import repository_call_seconds, timed_methods
+
+log = logger_config(__name__)
+
+
+@timed_methods(repository_call_seconds)
+class TeamRatingRepository:
+    @staticmethod
+    async def add_deltas(
+        session: AsyncSession, deltas: list[Dict[str, Union[int, float]]]
+    ) -> None:
+        if not deltas:
+            return
+        now = datetime.now(timezone.utc)
+        # Rows are upserted in team order, so concurrent batches lock the
+        # teams they share in the same order instead of deadlocking.
+        stmt = pg_insert(TeamRating).values(
+            [
+                {
+                    "team_id": d["team_id"],
+                    "player_count": d["player_count"],
+                    "score_sum": d["score_sum"],
+                    "score_count": d["score_count"],
+                    "average_score": d["score_sum"] / d["score_count"]
+                    if d["score_count"]
+                    else None,
+                    "last_updated": now,
+                }
+                for d in sorted(deltas, key=lambda d: d["team_id"])
+            ]
+        )
+        score_sum = TeamRating.score_sum + stmt.excluded.score_sum
+        score_count = TeamRating.score_count + stmt.excluded.score_count
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[TeamRating.team_id],
+            set_={
+                "player_count": TeamRating.player_count + stmt.excluded.player_count,
+                "score_sum": score_sum,
+                "score_count": score_count,
+                "average_score": score_sum / func.nullif(score_count, 0),
+                "last_updated": stmt.excluded.last_updated,
+            },
+        )
+        await session.execute(stmt)
+        log.info("Team ratings updated in repository for %s teams", len(deltas))
+
+    @staticmethod
+    async def get_by_team_id(
+        session: AsyncSession, team_id: int
+    ) -> Optional[TeamRating]:
+        stmt = sql_select(TeamRating).where(TeamRating.team_id == team_id)
+        result = await session.execute(stmt)
+        team_rating = result.scalars().first()
+        if team_rating:
+            log.debug(
+                "Team rating found in repository for team %s", team_rating.team_id
+            )
+        return team_rating
+
+    @staticmethod
+    async def rebuild(
+        session: AsyncSession, team_ids: Optional[list[int]] = None
+    ) -> None:
+        score_sum: ColumnElement[float] = func.sum(
+            PlayerRating.average_score * PlayerRating.total_of_scores
+        )
+        score_count: ColumnElement[int] = func.sum(PlayerRating.total_of_scores)
+        select_stmt = sql_select(
+            PlayerRating.team_id,
+            func.count(),
+            score_sum,
+            score_count,
+            score_sum / func.nullif(score_count, 0),
+            func.now(),
+        ).group_by(PlayerRating.team_id)
+        if team_ids is not None:
+            select_stmt = select_stmt.where(PlayerRating.team_id.in_(team_ids))
+        stmt = pg_insert(TeamRating).from_select(
+            [
+                TeamRating.team_id,
+                TeamRating.player_count,
+                TeamRating.score_sum,
+                TeamRating.score_count,
+                TeamRating.average_score,
+                TeamRating.last_updated,
+            ],
+            select_stmt,
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[TeamRating.team_id],
+            set_={
+                "player_count": stmt.excluded.player_count,
+                "score_sum": stmt.excluded.score_sum,
+                "score_count": stmt.excluded.score_count,
+                "average_score": stmt.excluded.average_score,
+                "last_updated": stmt.excluded.last_updated,
+            },
+        )
+        await session.execute(stmt)
+        log.info(
+            "Team ratings rebuilt in repository from player ratings for %s",
+            team_ids or "all teams",
+        )
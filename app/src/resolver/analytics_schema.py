@@ -0,0 +1,33 @@
+from typing import List, Optional
+import strawberry
+
+
+@strawberry.type
+class PlayerAnalytics:
+    player_id: int = strawberry.field(name="player_id")
+    player_average_rating: float = strawberry.field(name="player_average_rating")
+    team_rank: int = strawberry.field(name="team_rank")
+    team_percentile: float = strawberry.field(name="team_percentile")
+    league_rank: int = strawberry.field(name="league_rank")
+    league_percentile: float = strawberry.field(name="league_percentile")
+
+
+@strawberry.type
+class HistogramBucket:
+    lower: float = strawberry.field(name="lower")
+    upper: float = strawberry.field(name="upper")
+    count: int = strawberry.field(name="count")
+
+
+@strawberry.type
+class TeamAnalytics:
+    team_id: int = strawberry.field(name="team_id")
+    player_count: int = strawberry.field(name="player_count")
+    mean: Optional[float] = strawberry.field(name="mean")
+    stddev: Optional[float] = strawberry.field(name="stddev")
+    p25: Optional[float] = strawberry.field(name="p25")
+    median: Optional[float] = strawberry.field(name="median")
+    p75: Optional[float] = strawberry.field(name="p75")
+    p90: Optional[float] = strawberry.field(name="p90")
+    histogram: List[HistogramBucket] = strawberry.field(name="histogram")
+    players_data: List[PlayerAnalytics] = strawberry.field(name="players_data")
@@ -0,0 +1,17 @@
+from typing import Any, Dict, List, Optional
+
+from strawberry.dataloader import DataLoader
+
+from resolver.player_rating_schema import PlayerRatingList
+from service.rating_service import RatingService
+
+
+async def load_teams_rating(team_ids: List[int]) -> List[Optional[PlayerRatingList]]:
+    teams_rating = await RatingService.get_teams_rating(team_ids)
+    return [teams_rating.get(team_id) for team_id in team_ids]
+
+
+def get_loaders() -> Dict[str, Any]:
+    return {
+        "teams_rating_loader": DataLoader(load_fn=load_teams_rating),
+    }
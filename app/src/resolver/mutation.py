@@ -5,6 +5,7 @@ from resolver.player_rating_schema import TeamRatingInput, TeamRatingOutput
 from service.rating_service import RatingService
 
 from utils.logger import logger_config
+from utils.metrics import graphql_operation_seconds, timed
 
 log = logger_config(__name__)
 
@@ -12,6 +13,7 @@ log = logger_config(__name__)
 @strawberry.type
 class Mutation:
     @strawberry.mutation(name="rate_players")
+    @timed(graphql_operation_seconds.labels("rate_players"))
     async def rate_players(
         self,
         info: strawberry.Info,
@@ -20,5 +22,5 @@ class Mutation:
         ],
     ) -> Optional[TeamRatingOutput]:
         publisher = info.context["publisher"]
-        log.info(f"Rating players for team {team_rating.team_id}")
+        log.info("Rating players for team %s", team_rating.team_id)
         return await RatingService.rate_players(publisher, team_rating)
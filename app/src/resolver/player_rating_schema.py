@@ -1,4 +1,5 @@
-from typing import List
+from enum import Enum
+from typing import List, Optional
 import strawberry
 
 
@@ -20,12 +21,31 @@ class PlayerRatingInput:
 class PlayerRatingOutput:
     player_id: int = strawberry.field(name="player_id")
     player_average_rating: float = strawberry.field(name="player_average_rating")
+    player_recent_average_rating: Optional[float] = strawberry.field(
+        name="player_recent_average_rating", default=None
+    )
+    player_period_average_rating: Optional[float] = strawberry.field(
+        name="player_period_average_rating", default=None
+    )
+
+
+@strawberry.enum
+class PlayerRatingOrder(Enum):
+    AVERAGE_SCORE = "average_score"
+    PLAYER_ID = "player_id"
+
+
+@strawberry.type
+class PageInfo:
+    end_cursor: Optional[str] = strawberry.field(name="end_cursor")
+    has_next_page: bool = strawberry.field(name="has_next_page")
 
 
 @strawberry.type
 class PlayerRatingList:
     team_id: int = strawberry.field(name="team_id")
     players_data: List[PlayerRatingOutput] = strawberry.field(name="players_data")
+    page_info: Optional[PageInfo] = strawberry.field(name="page_info", default=None)
 
 
 @strawberry.input
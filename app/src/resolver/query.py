@@ -1,11 +1,15 @@
 import strawberry
-from typing import Annotated, Optional
+from typing import Annotated, List, Optional
 
-from resolver.player_rating_schema import PlayerRatingList
+from resolver.analytics_schema import TeamAnalytics
+from resolver.player_rating_schema import PlayerRatingList, PlayerRatingOrder
+from resolver.team_rating_schema import TeamRatingType
 
+from service.analytics_service import AnalyticsService
 from service.rating_service import RatingService
 
 from utils.logger import logger_config
+from utils.metrics import graphql_operation_seconds, timed
 
 log = logger_config(__name__)
 
@@ -13,9 +17,57 @@ log = logger_config(__name__)
 @strawberry.type
 class Query:
     @strawberry.field(name="get_players_rating")
+    @timed(graphql_operation_seconds.labels("get_players_rating"))
     async def get_players_rating(
         self,
+        info: strawberry.Info,
         team_id: Annotated[int, strawberry.argument(name="team_id")],
+        first: Annotated[Optional[int], strawberry.argument(name="first")] = None,
+        after: Annotated[Optional[str], strawberry.argument(name="after")] = None,
+        order_by: Annotated[
+            Optional[PlayerRatingOrder], strawberry.argument(name="order_by")
+        ] = None,
     ) -> Optional[PlayerRatingList]:
-        log.info(f"Getting players rating for team_id: {team_id}")
-        return await RatingService.get_players_rating(team_id)
+        log.info("Getting players rating for team_id: %s", team_id)
+        if first is not None or after is not None or order_by is not None:
+            return await RatingService.get_players_rating_page(
+                team_id, first, after, order_by
+            )
+        loader = info.context["teams_rating_loader"]
+        players_rating = await loader.load(team_id)
+        if players_rating:
+            return players_rating
+        raise Exception("No players found")
+
+    @strawberry.field(name="get_teams_rating")
+    @timed(graphql_operation_seconds.labels("get_teams_rating"))
+    async def get_teams_rating(
+        self,
+        info: strawberry.Info,
+        team_ids: Annotated[List[int], strawberry.argument(name="team_ids")],
+    ) -> List[PlayerRatingList]:
+        log.info("Getting players rating for team_ids: %s", team_ids)
+        loader = info.context["teams_rating_loader"]
+        players_ratings = await loader.load_many(team_ids)
+        return [
+            players_rating or PlayerRatingList(team_id=team_id, players_data=[])
+            for team_id, players_rating in zip(team_ids, players_ratings)
+        ]
+
+    @strawberry.field(name="get_team_rating")
+    @timed(graphql_operation_seconds.labels("get_team_rating"))
+    async def get_team_rating(
+        self,
+        team_id: Annotated[int, strawberry.argument(name="team_id")],
+    ) -> Optional[TeamRatingType]:
+        log.info("Getting team rating for team_id: %s", team_id)
+        return await RatingService.get_team_rating(team_id)
+
+    @strawberry.field(name="get_team_analytics")
+    @timed(graphql_operation_seconds.labels("get_team_analytics"))
+    async def get_team_analytics(
+        self,
+        team_id: Annotated[int, strawberry.argument(name="team_id")],
+    ) -> Optional[TeamAnalytics]:
+        log.info("Getting team analytics for team_id: %s", team_id)
+        return await AnalyticsService.get_team_analytics(team_id)
@@ -0,0 +1,10 @@
+from typing import Optional
+import strawberry
+
+
+@strawberry.type
+class TeamRatingType:
+    team_id: int = strawberry.field(name="team_id")
+    player_count: int = strawberry.field(name="player_count")
+    score_count: int = strawberry.field(name="score_count")
+    team_average_rating: Optional[float] = strawberry.field(name="team_average_rating")
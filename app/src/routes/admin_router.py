@@ -0,0 +1,16 @@
+from fastapi import APIRouter, HTTPException, Query, Request
+
+admin_router = APIRouter(prefix="/admin")
+
+
+@admin_router.post(
+    "/dead-letters/replay",
+    tags=["Admin"],
+    responses={200: {"description": "Number of dead-lettered events replayed"}},
+)
+async def replay_dead_letters(request: Request, limit: int = Query(100, ge=1)):
+    try:
+        replayed = await request.app.state.consumer.replay_dead_letters(limit)
+    except Exception as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return {"replayed": replayed}
@@ -1,5 +1,8 @@
 from fastapi import APIRouter
 
+from data.session import db
+from service.rating_service import team_ratings_cache
+
 health_router = APIRouter()
 
 
@@ -8,3 +11,21 @@ health_router = APIRouter()
 )
 async def health_check():
     return {"status": "ok"}
+
+
+@health_router.get(
+    "/health/db",
+    tags=["Sanity check"],
+    responses={200: {"description": "Database connection pool statistics"}},
+)
+async def db_pool_stats():
+    return db.pool_status()
+
+
+@health_router.get(
+    "/health/cache",
+    tags=["Sanity check"],
+    responses={200: {"description": "Team ratings cache statistics"}},
+)
+async def cache_stats():
+    return team_ratings_cache.stats()
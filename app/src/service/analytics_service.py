@@ -0,0 +1,171 @@
+from typing import TYPE_CHECKING, Optional, Sequence, Tuple
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from data.session import db
+
+from repository.player_rating_repository import PlayerRatingRepository
+
+from resolver.analytics_schema import HistogramBucket, PlayerAnalytics, TeamAnalytics
+
+from utils.cache import TTLCache
+from utils.logger import logger_config
+from utils.config import get_settings
+
+if TYPE_CHECKING:
+    import numpy as np
+
+log = logger_config(__name__)
+settings = get_settings()
+
+team_analytics_cache = TTLCache(
+    settings.RATINGS_CACHE_MAX_SIZE, settings.RATINGS_CACHE_TTL_SECONDS
+)
+
+# The whole league's ratings, shared by every team's analytics. Rating
+# updates do not invalidate it, it simply expires after a short TTL.
+league_ratings_cache = TTLCache(1, settings.ANALYTICS_LEAGUE_CACHE_TTL_SECONDS)
+LEAGUE_RATINGS_KEY = "league"
+
+RatingArrays = Tuple["np.ndarray", "np.ndarray", "np.ndarray"]
+
+
+def rating_arrays(
+    team_ids: Sequence[int], player_ids: Sequence[int], scores: Sequence[float]
+) -> RatingArrays:
+    # NumPy is only loaded once analytics are first requested, so it does
+    # not add to the service start-up time.
+    import numpy as np
+
+    return (
+        np.asarray(team_ids, dtype=np.int64),
+        np.asarray(player_ids, dtype=np.int64),
+        np.asarray(scores, dtype=np.float64),
+    )
+
+
+async def league_ratings(session: AsyncSession) -> RatingArrays:
+    cached = league_ratings_cache.get(LEAGUE_RATINGS_KEY)
+    if cached is not None:
+        return cached
+    ratings = rating_arrays(*await PlayerRatingRepository.get_rating_columns(session))
+    league_ratings_cache.set(LEAGUE_RATINGS_KEY, ratings)
+    return ratings
+
+
+def with_team_slice(
+    league: RatingArrays, team_id: int, team: RatingArrays
+) -> RatingArrays:
+    """Replaces the rows of `team_id` in the league arrays with `team`."""
+    import numpy as np
+
+    team_ids, player_ids, scores = league
+    others = team_ids != team_id
+    return (
+        np.concatenate((team_ids[others], team[0])),
+        np.concatenate((player_ids[others], team[1])),
+        np.concatenate((scores[others], team[2])),
+    )
+
+
+def rank_and_percentile(
+    sorted_scores: "np.ndarray", scores: "np.ndarray"
+) -> Tuple["np.ndarray", "np.ndarray"]:
+    """
+    Competition rank (1 is best, ties share a rank) and percentile rank
+    (ties count half) of each value in `scores` within `sorted_scores`.
+    """
+    import numpy as np
+
+    below = np.searchsorted(sorted_scores, scores, side="left")
+    at_or_below = np.searchsorted(sorted_scores, scores, side="right")
+    ranks = len(sorted_scores) - at_or_below + 1
+    percentiles = (below + at_or_below) / (2 * len(sorted_scores)) * 100
+    return ranks, percentiles
+
+
+def team_analytics(
+    team_id: int,
+    team_ids: "np.ndarray",
+    player_ids: "np.ndarray",
+    scores: "np.ndarray",
+    bins: int,
+) -> Optional[TeamAnalytics]:
+    import numpy as np
+
+    in_team = team_ids == team_id
+    team_scores = scores[in_team]
+    if not team_scores.size:
+        return None
+    team_players = player_ids[in_team]
+
+    team_ranks, team_percentiles = rank_and_percentile(
+        np.sort(team_scores), team_scores
+    )
+    league_ranks, league_percentiles = rank_and_percentile(np.sort(scores), team_scores)
+    p25, median, p75, p90 = np.percentile(team_scores, [25, 50, 75, 90])
+    # Buckets span the whole league so histograms are comparable across teams.
+    low, high = float(scores.min()), float(scores.max())
+    counts, edges = np.histogram(
+        team_scores, bins=bins, range=(low, high if high > low else low + 1)
+    )
+
+    order = np.lexsort((-team_players, -team_scores))
+    return TeamAnalytics(
+        team_id=team_id,
+        player_count=int(team_scores.size),
+        mean=float(team_scores.mean()),
+        stddev=float(team_scores.std()),
+        p25=float(p25),
+        median=float(median),
+        p75=float(p75),
+        p90=float(p90),
+        histogram=[
+            HistogramBucket(lower=float(lower), upper=float(upper), count=int(count))
+            for lower, upper, count in zip(edges[:-1], edges[1:], counts)
+        ],
+        players_data=[
+            PlayerAnalytics(
+                player_id=int(team_players[i]),
+                player_average_rating=float(team_scores[i]),
+                team_rank=int(team_ranks[i]),
+                team_percentile=float(team_percentiles[i]),
+                league_rank=int(league_ranks[i]),
+                league_percentile=float(league_percentiles[i]),
+            )
+            for i in order
+        ],
+    )
+
+
+class AnalyticsService:
+    @staticmethod
+    async def get_team_analytics(team_id: int) -> Optional[TeamAnalytics]:
+        cached = team_analytics_cache.get(team_id)
+        if cached is not None:
+            return cached
+        version = team_analytics_cache.version(team_id)
+        async with db.unit_of_work() as session:
+            league = await league_ratings(session)
+            team = rating_arrays(
+                *await PlayerRatingRepository.get_rating_columns(session, team_id)
+            )
+        # The team's own ratings are always read fresh; other teams may lag
+        # by up to ANALYTICS_LEAGUE_CACHE_TTL_SECONDS.
+        team_ids, player_ids, scores = with_team_slice(league, team_id, team)
+
+        analytics = team_analytics(
+            team_id, team_ids, player_ids, scores, settings.ANALYTICS_HISTOGRAM_BINS
+        )
+        if analytics is not None:
+            team_analytics_cache.set(team_id, analytics, version)
+        log.info(
+            "Computed analytics for team %s against %s league ratings",
+            team_id,
+            scores.size,
+        )
+        return analytics
+
+    @staticmethod
+    def invalidate_team_analytics(team_id: int):
+        team_analytics_cache.invalidate(team_id)
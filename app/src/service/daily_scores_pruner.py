@@ -0,0 +1,60 @@
+import asyncio
+from typing import Optional
+
+from data.session import db
+
+from repository.player_daily_score_repository import PlayerDailyScoreRepository
+
+from service.rating_service import window_start
+
+from utils.logger import logger_config
+from utils.config import get_settings
+
+log = logger_config(__name__)
+settings = get_settings()
+
+
+class DailyScoresPruner:
+    """
+    Background task that deletes the per-day score buckets that fell out of
+    the RATING_WINDOW_DAYS window, once at startup and then every interval.
+    Reads already ignore those buckets, so pruning only reclaims space and
+    is kept off the score write path.
+    """
+
+    def __init__(
+        self, interval_seconds: float = settings.RATING_WINDOW_PRUNE_INTERVAL_SECONDS
+    ):
+        self.interval = interval_seconds
+        self.task: Optional[asyncio.Task] = None
+        self.closing = asyncio.Event()
+
+    def start(self):
+        self.closing.clear()
+        if self.task is None:
+            self.task = asyncio.create_task(self._run())
+
+    async def _run(self):
+        while not self.closing.is_set():
+            try:
+                await self.prune_once()
+            except Exception as e:
+                log.error("Error pruning daily score buckets: %s", e)
+            try:
+                await asyncio.wait_for(self.closing.wait(), timeout=self.interval)
+            except asyncio.TimeoutError:
+                pass
+
+    async def prune_once(self) -> int:
+        async with db.unit_of_work() as session:
+            return await PlayerDailyScoreRepository.prune(session, window_start())
+
+    async def close(self):
+        if self.task is None:
+            return
+        self.closing.set()
+        await self.task
+        self.task = None
+
+
+daily_scores_pruner = DailyScoresPruner()
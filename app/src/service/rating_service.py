@@ -1,32 +1,135 @@
 from fastapi import FastAPI
-from typing import Any, Dict, Optional
+from sqlalchemy.ext.asyncio import AsyncSession
+import base64
+import json
+from typing import Any, Dict, List, Mapping, Optional, Sequence, Set, Tuple
 
-from datetime import datetime, timezone
+from datetime import date, datetime, timedelta, timezone
 
-from repository.player_rating_repository import PlayerRatingRepository
+from data.session import db
+
+from repository.player_daily_score_repository import PlayerDailyScoreRepository
+from repository.player_rating_repository import PlayerRatingRepository, ScoreDelta
 from repository.score_repository import ScoreRepository
+from repository.team_rating_repository import TeamRatingRepository
 
 from models.score_model import Score
-from models.player_rating_model import PlayerRating
 
 from resolver.score_schema import ScoreInput, ScoreType
+from resolver.team_rating_schema import TeamRatingType
 from resolver.player_rating_schema import (
+    PageInfo,
     PlayerRatingInput,
     PlayerRatingList,
+    PlayerRatingOrder,
     PlayerRatingOutput,
     PlayerRatingType,
     TeamRatingInput,
     TeamRatingOutput,
 )
 
-from events.publisher import Publisher, publish_event
+from service.analytics_service import AnalyticsService
+
+from events.outbox import dispatch_events, stage_events
+from events.publisher import Publisher
 
+from utils.cache import TTLCache
 from utils.logger import logger_config
 from utils.config import get_settings
 
 log = logger_config(__name__)
 settings = get_settings()
 
+team_ratings_cache = TTLCache(
+    settings.RATINGS_CACHE_MAX_SIZE, settings.RATINGS_CACHE_TTL_SECONDS
+)
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+RATING_WINDOW_SCORES = max(1, settings.RATING_WINDOW_SCORES)
+RATING_WINDOW_DAYS = max(1, settings.RATING_WINDOW_DAYS)
+
+
+def encode_cursor(order_by: PlayerRatingOrder, average_score: float, player_id: int):
+    cursor = json.dumps([order_by.value, average_score, player_id])
+    return base64.urlsafe_b64encode(cursor.encode()).decode()
+
+
+def decode_cursor(order_by: PlayerRatingOrder, cursor: str) -> Tuple[float, int]:
+    try:
+        order, average_score, player_id = json.loads(base64.urlsafe_b64decode(cursor))
+        after = float(average_score), int(player_id)
+    except (ValueError, TypeError):
+        raise Exception(f"Invalid cursor: {cursor}") from None
+    if order != order_by.value:
+        raise Exception(f"Cursor {cursor} was not created for order {order_by.value}")
+    return after
+
+
+def window_start(today: Optional[date] = None) -> date:
+    """First day included in the RATING_WINDOW_DAYS window."""
+    today = today or datetime.now(timezone.utc).date()
+    return today - timedelta(days=RATING_WINDOW_DAYS - 1)
+
+
+def window_average(
+    score_sum: Optional[float], score_count: Optional[int]
+) -> Optional[float]:
+    if score_sum is None or not score_count:
+        return None
+    return float(score_sum) / score_count
+
+
+def rating_output(
+    player_id: int,
+    average_score: float,
+    recent_scores: Optional[List[int]],
+    window_total: Optional[Tuple[float, int]],
+) -> PlayerRatingOutput:
+    return PlayerRatingOutput(
+        player_id=player_id,
+        player_average_rating=average_score,
+        player_recent_average_rating=window_average(
+            sum(recent_scores or []), len(recent_scores or [])
+        ),
+        player_period_average_rating=window_average(*(window_total or (None, None))),
+    )
+
+
+async def add_daily_scores(session: AsyncSession, deltas: Sequence[Mapping[str, Any]]):
+    """
+    Adds score sums to today's per-player bucket. Buckets that fell out of
+    the window are deleted by `daily_scores_pruner`, off this write path.
+    """
+    today = datetime.now(timezone.utc).date()
+    await PlayerDailyScoreRepository.add_scores(session, today, deltas)
+
+
+def team_deltas(
+    rows: Sequence[Mapping[str, Any]], new_players: bool = False
+) -> List[Dict[str, Any]]:
+    """
+    Folds player rating changes into one delta per team for
+    TeamRatingRepository.add_deltas. Rows are either new player ratings
+    (average_score/total_of_scores) or score deltas (score_sum/score_count).
+    """
+    deltas: Dict[int, Dict[str, Any]] = {}
+    for row in rows:
+        team_id = int(row["team_id"])
+        delta = deltas.setdefault(
+            team_id,
+            {"team_id": team_id, "player_count": 0, "score_sum": 0, "score_count": 0},
+        )
+        if new_players:
+            delta["player_count"] += 1
+            delta["score_sum"] += row["average_score"] * row["total_of_scores"]
+            delta["score_count"] += row["total_of_scores"]
+        else:
+            delta["score_sum"] += row["score_sum"]
+            delta["score_count"] += row["score_count"]
+    return list(deltas.values())
+
 
 class RatingService:
     @staticmethod
@@ -57,23 +160,46 @@ class RatingService:
                 player_score=player_score,
             )
             await RatingService.update_rating(new_rating, publisher)
+        elif event_type == "rating_updated":
+            RatingService.invalidate_team_ratings(data["team_id"])
         else:
-            log.info(f"Event type {event_type} consumed but not handled.")
+            log.info("Event type %s consumed but not handled.", event_type)
         return data
 
     @staticmethod
-    async def rating_exists_by_player_id(player_id: int, team_id: int) -> bool:
-        player_rating = await PlayerRatingRepository.get_rating_by_player_id(
-            player_id, team_id
-        )
-        return player_rating is not None
+    async def add_rating(session: AsyncSession, new_score: PlayerRatingInput) -> bool:
+        rating = {
+            "player_id": new_score.player_id,
+            "team_id": new_score.player_team_id,
+            "average_score": new_score.player_score,
+            "total_of_scores": 1,
+            "recent_scores": [new_score.player_score],
+            "last_updated": datetime.now(timezone.utc),
+        }
+        created = await PlayerRatingRepository.create_missing(session, [rating])
+        if created:
+            await TeamRatingRepository.add_deltas(
+                session, team_deltas([rating], new_players=True)
+            )
+            await add_daily_scores(
+                session,
+                [
+                    {
+                        "team_id": rating["team_id"],
+                        "player_id": rating["player_id"],
+                        "score_sum": new_score.player_score,
+                        "score_count": 1,
+                    }
+                ],
+            )
+        return bool(created)
 
     @staticmethod
     async def create_score(
         score_data: ScoreInput,
         publisher: Publisher,
     ) -> Optional[ScoreType]:
-        log.info(f"Creating score: {score_data}")
+        log.info("Creating score: %s", score_data)
 
         new_score = Score(
             player_id=score_data.player_id,
@@ -86,111 +212,268 @@ class RatingService:
             player_id = int(new_score.player_id)
             team_id = int(new_score.team_id)
             player_score = int(new_score.score)
-            if not await RatingService.rating_exists_by_player_id(player_id, team_id):
-                log.info(
-                    f"Player rating for player_id: {new_score.player_id} and team_id: {new_score.team_id} does not exist. Creating new player rating."
+            new_rating = PlayerRatingInput(
+                player_id=player_id,
+                player_team_id=team_id,
+                player_score=player_score,
+            )
+            async with db.unit_of_work() as session:
+                rating_created = await RatingService.add_rating(session, new_rating)
+                score = (await ScoreRepository.create(session, new_score)).to_dict()
+
+                events = []
+                if rating_created:
+                    events.append(("rating_updated", {"team_id": team_id}))
+                score_created = ScoreType(
+                    player_id=score["player_id"],
+                    team_id=score["team_id"],
+                    player_score=score["score"],
                 )
-                new_rating = PlayerRatingInput(
-                    player_id=player_id,
-                    player_team_id=team_id,
-                    player_score=player_score,
+                events.append(
+                    (
+                        "score_created",
+                        {
+                            "player_id": score_created.player_id,
+                            "team_id": score_created.team_id,
+                            "score": score_created.player_score,
+                        },
+                    )
                 )
-                await RatingService.create_rating(new_rating, publisher)
-            score = (await ScoreRepository.create(new_score)).to_dict()
-            score_created = ScoreType(
-                player_id=score["player_id"],
-                team_id=score["team_id"],
-                player_score=score["score"],
-            )
+                await stage_events(session, events)
 
-            log.info(
-                f"Publishing event: score_created with data: {{'player_id': {score_created.player_id}, 'team_id': {score_created.team_id}, 'score': {score_created.player_score}}}"
-            )
+            if rating_created:
+                log.info(
+                    "Player rating for player_id: %s and team_id: %s did not exist. Created new player rating.",
+                    player_id,
+                    team_id,
+                )
+                RatingService.invalidate_team_ratings(team_id)
 
-            await publish_event(
-                publisher,
-                "score_created",
-                {
-                    "player_id": score_created.player_id,
-                    "team_id": score_created.team_id,
-                    "score": score_created.player_score,
-                },
-            )
+            log.info("Publishing %s events for team %s", len(events), team_id)
+            await dispatch_events(publisher, events)
             return score_created
         except Exception as e:
-            log.error(f"Error creating score: {e}")
+            log.error("Error creating score: %s", e)
             raise e
 
     @staticmethod
     async def create_rating(
         new_score: PlayerRatingInput, publisher: Publisher
     ) -> Optional[PlayerRatingType]:
-        new_rating = PlayerRating(
-            player_id=new_score.player_id,
-            team_id=new_score.player_team_id,
-            average_score=new_score.player_score,
-            total_of_scores=1,
-            last_updated=datetime.now(timezone.utc),
-        )
-
-        rating = (await PlayerRatingRepository.create(new_rating)).to_dict()
+        events = [("rating_updated", {"team_id": new_score.player_team_id})]
+        async with db.unit_of_work() as session:
+            await RatingService.add_rating(session, new_score)
+            await stage_events(session, events)
+        RatingService.invalidate_team_ratings(new_score.player_team_id)
         rating_created = PlayerRatingType(
-            player_id=rating["player_id"],
-            player_team_id=rating["team_id"],
-            player_average_rating=rating["average_score"],
+            player_id=new_score.player_id,
+            player_team_id=new_score.player_team_id,
+            player_average_rating=new_score.player_score,
         )
 
         log.info(
-            f"Publishing event: rating_updated with data: {{'team_id': {rating_created.player_team_id}}}"
-        )
-        await publish_event(
-            publisher,
-            "rating_updated",
-            {
-                "team_id": rating_created.player_team_id,
-            },
+            "Publishing event: rating_updated with data: {'team_id': %s}",
+            rating_created.player_team_id,
         )
+        await dispatch_events(publisher, events)
         return rating_created
 
     @staticmethod
     async def get_players_rating(team_id: int) -> PlayerRatingList:
-        players = await PlayerRatingRepository.get_players_by_team_id(team_id)
-        players_dict = [player.to_dict() for player in players]
-        if players:
-            players_data = [
-                PlayerRatingOutput(
-                    player_id=player["player_id"],
-                    player_average_rating=player["average_score"],
-                )
-                for player in players_dict
-            ]
-            return PlayerRatingList(team_id=team_id, players_data=players_data)
+        players_rating = (await RatingService.get_teams_rating([team_id])).get(team_id)
+        if players_rating:
+            return players_rating
         raise Exception("No players found")
 
+    @staticmethod
+    async def get_players_rating_page(
+        team_id: int,
+        first: Optional[int] = None,
+        after: Optional[str] = None,
+        order_by: Optional[PlayerRatingOrder] = None,
+    ) -> PlayerRatingList:
+        order_by = order_by or PlayerRatingOrder.AVERAGE_SCORE
+        first = DEFAULT_PAGE_SIZE if first is None else first
+        if not 0 < first <= MAX_PAGE_SIZE:
+            raise Exception(f"first must be between 1 and {MAX_PAGE_SIZE}")
+        after_key = decode_cursor(order_by, after) if after else None
+
+        async with db.unit_of_work() as session:
+            rows = await PlayerRatingRepository.get_players_page(
+                session, team_id, order_by.value, first + 1, after_key
+            )
+            page = rows[:first]
+            # Same contract as the unpaged query; only a cursor past the last
+            # player may yield an empty page.
+            if not page and after_key is None:
+                raise Exception("No players found")
+            window_totals = {
+                row.player_id: (row.score_sum, row.score_count)
+                for row in await PlayerDailyScoreRepository.get_window_totals(
+                    session,
+                    [team_id],
+                    window_start(),
+                    player_ids=[row.player_id for row in page],
+                )
+            }
+        players_data = [
+            rating_output(
+                row.player_id,
+                row.average_score,
+                row.recent_scores,
+                window_totals.get(row.player_id),
+            )
+            for row in page
+        ]
+        end_cursor = (
+            encode_cursor(order_by, page[-1].average_score, page[-1].player_id)
+            if page
+            else None
+        )
+        return PlayerRatingList(
+            team_id=team_id,
+            players_data=players_data,
+            page_info=PageInfo(end_cursor=end_cursor, has_next_page=len(rows) > first),
+        )
+
+    @staticmethod
+    async def get_teams_rating(team_ids: List[int]) -> Dict[int, PlayerRatingList]:
+        teams_rating: Dict[int, PlayerRatingList] = {}
+        versions: Dict[int, int] = {}
+        for team_id in dict.fromkeys(team_ids):
+            cached = team_ratings_cache.get(team_id)
+            if cached is not None:
+                teams_rating[team_id] = cached
+            else:
+                versions[team_id] = team_ratings_cache.version(team_id)
+        if not versions:
+            return teams_rating
+
+        async with db.unit_of_work() as session:
+            players = await PlayerRatingRepository.get_players_by_team_ids(
+                session, list(versions)
+            )
+            window_totals = {
+                (row.team_id, row.player_id): (row.score_sum, row.score_count)
+                for row in await PlayerDailyScoreRepository.get_window_totals(
+                    session, list(versions), window_start()
+                )
+            }
+        players_data: Dict[int, List[PlayerRatingOutput]] = {}
+        for player in players:
+            players_data.setdefault(int(player.team_id), []).append(
+                rating_output(
+                    int(player.player_id),
+                    float(player.average_score),
+                    player.recent_scores,
+                    window_totals.get((player.team_id, player.player_id)),
+                )
+            )
+        for team_id, team_players in players_data.items():
+            players_rating = PlayerRatingList(
+                team_id=team_id, players_data=team_players
+            )
+            team_ratings_cache.set(team_id, players_rating, versions[team_id])
+            teams_rating[team_id] = players_rating
+        return teams_rating
+
+    @staticmethod
+    async def get_team_rating(team_id: int) -> Optional[TeamRatingType]:
+        async with db.unit_of_work() as session:
+            team_rating = await TeamRatingRepository.get_by_team_id(session, team_id)
+        if team_rating is None:
+            return None
+        return TeamRatingType(
+            team_id=int(team_rating.team_id),
+            player_count=int(team_rating.player_count),
+            score_count=int(team_rating.score_count),
+            team_average_rating=float(team_rating.average_score)
+            if team_rating.average_score is not None
+            else None,
+        )
+
+    @staticmethod
+    def invalidate_team_ratings(team_id: int):
+        team_ratings_cache.invalidate(team_id)
+        AnalyticsService.invalidate_team_analytics(team_id)
+
     @staticmethod
     async def rate_players(
         publisher: Publisher, team_rating: TeamRatingInput
     ) -> Optional[TeamRatingOutput]:
         team_id = team_rating.team_id
         players_data = team_rating.players_data
+        now = datetime.now(timezone.utc)
+
+        new_ratings: Dict[int, Dict[str, Any]] = {}
+        new_scores = []
         for player in players_data:
-            player_id = player.player_id
-            player_score = player.player_score
-            player_rating = ScoreInput(
-                player_id=player_id,
-                team_id=team_id,
-                player_score=player_score,
+            new_ratings.setdefault(
+                player.player_id,
+                {
+                    "player_id": player.player_id,
+                    "team_id": team_id,
+                    "average_score": player.player_score,
+                    "total_of_scores": 1,
+                    "recent_scores": [player.player_score],
+                    "last_updated": now,
+                },
+            )
+            new_scores.append(
+                {
+                    "player_id": player.player_id,
+                    "team_id": team_id,
+                    "score": player.player_score,
+                    "created_at": now,
+                }
             )
-            await RatingService.create_score(player_rating, publisher)
 
-        log.info(f"Publishing event: rating_updated for team: {{'team_id': {team_id}}}")
-        await publish_event(
-            publisher,
-            "rating_updated",
-            {
-                "team_id": team_id,
-            },
+        async with db.unit_of_work() as session:
+            created = await PlayerRatingRepository.create_missing(
+                session, list(new_ratings.values())
+            )
+            await TeamRatingRepository.add_deltas(
+                session,
+                team_deltas(
+                    [new_ratings[player_id] for player_id in created], new_players=True
+                ),
+            )
+            await add_daily_scores(
+                session,
+                [
+                    {
+                        "team_id": team_id,
+                        "player_id": player_id,
+                        "score_sum": new_ratings[player_id]["average_score"],
+                        "score_count": 1,
+                    }
+                    for player_id in created
+                ],
+            )
+            scores = await ScoreRepository.create_many(session, new_scores)
+            events: List[Tuple[str, Dict[str, Any]]] = [
+                (
+                    "score_created",
+                    {
+                        "player_id": score.player_id,
+                        "team_id": score.team_id,
+                        "score": score.score,
+                    },
+                )
+                for score in scores
+            ]
+            events.append(("rating_updated", {"team_id": team_id}))
+            await stage_events(session, events)
+        RatingService.invalidate_team_ratings(team_id)
+        log.info(
+            "Rated %s players for team %s, %s new player ratings",
+            len(scores),
+            team_id,
+            len(created),
         )
+
+        log.info("Publishing %s events for team: {'team_id': %s}", len(events), team_id)
+        await dispatch_events(publisher, events)
         return TeamRatingOutput(team_id=team_id)
 
     @staticmethod
@@ -200,22 +483,25 @@ class RatingService:
         player_id = new_rating.player_id
         team_id = new_rating.player_team_id
         player_score = new_rating.player_score
+        events = [("rating_updated", {"team_id": team_id})]
 
-        player_rating = await PlayerRatingRepository.get_rating_by_player_id(
-            player_id, team_id
-        )
+        async with db.unit_of_work() as session:
+            player_rating = await PlayerRatingRepository.add_score(
+                session, player_id, team_id, player_score, RATING_WINDOW_SCORES
+            )
+            if player_rating is not None:
+                delta = {
+                    "team_id": team_id,
+                    "player_id": player_id,
+                    "score_sum": player_score,
+                    "score_count": 1,
+                }
+                await TeamRatingRepository.add_deltas(session, team_deltas([delta]))
+                await add_daily_scores(session, [delta])
+                await stage_events(session, events)
         if player_rating is not None:
-            player_rating_dict = player_rating.to_dict()
-            total_of_scores = player_rating_dict["total_of_scores"]
-            average_score = player_rating_dict["average_score"]
-            new_total_of_scores = total_of_scores + 1
-            new_average_score = (
-                (average_score * total_of_scores) + player_score
-            ) / new_total_of_scores
-            player_rating.average_score = new_average_score
-            player_rating.total_of_scores = new_total_of_scores
-            # player_rating.last_updated = datetime.now(timezone.utc)
-            await PlayerRatingRepository.update(player_rating)
+            RatingService.invalidate_team_ratings(team_id)
+            await dispatch_events(publisher, events)
             rating_updated = PlayerRatingType(
                 player_id=int(player_rating.player_id),
                 player_team_id=int(player_rating.team_id),
@@ -224,3 +510,52 @@ class RatingService:
 
             return rating_updated
         raise Exception("Player rating not found")
+
+    @staticmethod
+    async def apply_scores(
+        scores: List[Dict[str, Any]], publisher: Optional[Publisher] = None
+    ) -> Set[Tuple[int, int]]:
+        deltas: Dict[Tuple[int, int], ScoreDelta] = {}
+        for score in scores:
+            key = (int(score["player_id"]), int(score["team_id"]))
+            delta = deltas.setdefault(
+                key,
+                {
+                    "player_id": key[0],
+                    "team_id": key[1],
+                    "score_sum": 0,
+                    "score_count": 0,
+                    "scores": [],
+                },
+            )
+            delta["score_sum"] += int(score["score"])
+            delta["score_count"] += 1
+            delta["scores"].append(int(score["score"]))
+
+        async with db.unit_of_work() as session:
+            player_ratings = await PlayerRatingRepository.add_score_deltas(
+                session, list(deltas.values()), RATING_WINDOW_SCORES
+            )
+            applied = {
+                (int(rating.player_id), int(rating.team_id))
+                for rating in player_ratings
+            }
+            await TeamRatingRepository.add_deltas(
+                session, team_deltas([deltas[key] for key in applied])
+            )
+            await add_daily_scores(session, [deltas[key] for key in applied])
+            team_ids = {team_id for _, team_id in applied}
+            events = [("rating_updated", {"team_id": team_id}) for team_id in team_ids]
+            if publisher is not None:
+                await stage_events(session, events)
+        for team_id in team_ids:
+            RatingService.invalidate_team_ratings(team_id)
+        log.info(
+            "Applied %s scores as %s rating updates, %s not found",
+            len(scores),
+            len(deltas),
+            len(deltas) - len(applied),
+        )
+        if publisher is not None:
+            await dispatch_events(publisher, events)
+        return applied
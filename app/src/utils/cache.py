@@ -0,0 +1,92 @@
+from collections import OrderedDict
+from time import monotonic
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+
+class TTLCache:
+    """
+    In-process LRU cache with a per-entry time to live.
+    Each key keeps an invalidation version so a value loaded before an
+    invalidation is not stored after it (see `version` and `set`).
+
+    Versions come from one counter shared by all keys. A key's version is
+    dropped when its entry expires or is evicted, and at most max_size
+    versions are kept. A dropped key then reports `version_floor`, the
+    highest version dropped so far, which is never lower than the version
+    it had, so a value loaded before a dropped invalidation is still refused.
+    """
+
+    def __init__(self, max_size: int, ttl_seconds: float):
+        self.max_size = max_size
+        self.ttl = ttl_seconds
+        self.entries: OrderedDict[Hashable, Tuple[float, Any]] = OrderedDict()
+        self.versions: Dict[Hashable, int] = {}
+        self.version_counter = 0
+        self.version_floor = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        entry = self.entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        expires_at, value = entry
+        if expires_at < monotonic():
+            del self.entries[key]
+            self._drop_version(key)
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def version(self, key: Hashable) -> int:
+        return self.versions.get(key, self.version_floor)
+
+    def set(self, key: Hashable, value: Any, version: Optional[int] = None):
+        if self.max_size <= 0:
+            return
+        if version is not None and version != self.version(key):
+            return
+        self.entries[key] = (monotonic() + self.ttl, value)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_size:
+            evicted, _ = self.entries.popitem(last=False)
+            self._drop_version(evicted)
+            self.evictions += 1
+
+    def invalidate(self, key: Hashable):
+        self.version_counter += 1
+        # Re-inserting keeps the versions in invalidation order.
+        self.versions.pop(key, None)
+        self.versions[key] = self.version_counter
+        while len(self.versions) > max(self.max_size, 0):
+            self._drop_version(next(iter(self.versions)))
+        if self.entries.pop(key, None) is not None:
+            self.invalidations += 1
+
+    def _drop_version(self, key: Hashable):
+        version = self.versions.pop(key, None)
+        if version is not None:
+            self.version_floor = max(self.version_floor, version)
+
+    def clear(self):
+        for key in list(self.entries):
+            self.invalidate(key)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self.entries),
+            "max_size": self.max_size,
+            "ttl_seconds": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+            "versions": len(self.versions),
+        }
@@ -1,7 +1,9 @@
 import os
+from functools import lru_cache
 
 from dotenv import load_dotenv
 
+from pydantic import model_validator
 from pydantic_settings import BaseSettings
 
 load_dotenv(os.path.join(os.path.dirname(__file__), "../../.env"))
@@ -11,6 +13,8 @@ class Settings(BaseSettings):
     DEBUG: bool
     DEBUG_PORT: str
     LOG_LEVEL: str
+    LOG_FORMAT: str
+    LOG_SAMPLING: str
     DOCKERHUB_USERNAME: str
     IMAGE_NAME: str
     IMAGE_VERSION: str
@@ -27,6 +31,13 @@ class Settings(BaseSettings):
     DB_USER: str
     DB_PASSWORD: str
     DB_NAME: str
+    DB_ECHO: bool
+    DB_POOL_SIZE: int
+    DB_MAX_OVERFLOW: int
+    DB_POOL_TIMEOUT: float
+    DB_POOL_PRE_PING: bool
+    DB_POOL_RECYCLE: int
+    DB_STATEMENT_CACHE_SIZE: int
     API_GATEWAY_HOST: str
     API_GATEWAY_PORT: str
     BROKER_HOST: str
@@ -37,6 +48,39 @@ class Settings(BaseSettings):
     BROKER_ATTEMPT_DELAY: int
     QUEUE_NAME: str
     EXCHANGE_NAME: str
+    CONSUMER_PREFETCH_COUNT: int
+    CONSUMER_MAX_WORKERS: int
+    CONSUMER_WORK_QUEUE: bool
+    CONSUMER_MAX_ATTEMPTS: int
+    CONSUMER_RETRY_BASE_DELAY_MS: int
+    SCORE_BATCH_MAX_SIZE: int
+    SCORE_BATCH_MAX_DELAY_MS: int
+    PUBLISHER_BUFFERED: bool
+    PUBLISHER_BATCH_SIZE: int
+    PUBLISHER_FLUSH_INTERVAL_MS: int
+    EVENT_CODEC: str
+    OUTBOX_ENABLED: bool
+    OUTBOX_BATCH_SIZE: int
+    OUTBOX_POLL_INTERVAL_MS: int
+    LOCAL_EVENT_TYPES: str
+    RATINGS_CACHE_MAX_SIZE: int
+    RATINGS_CACHE_TTL_SECONDS: float
+    RATING_WINDOW_SCORES: int
+    RATING_WINDOW_DAYS: int
+    RATING_WINDOW_PRUNE_INTERVAL_SECONDS: int
+    ANALYTICS_HISTOGRAM_BINS: int
+    ANALYTICS_LEAGUE_CACHE_TTL_SECONDS: int
+
+    @model_validator(mode="after")
+    def check_local_event_types(self) -> "Settings":
+        # The outbox relay publishes every event, so nothing would ever go
+        # through the local event bus.
+        if self.OUTBOX_ENABLED and self.LOCAL_EVENT_TYPES.strip():
+            raise ValueError(
+                "LOCAL_EVENT_TYPES cannot be used with OUTBOX_ENABLED, "
+                "leave it empty or disable the outbox"
+            )
+        return self
 
     @property
     def SQLALCHEMY_DATABASE_URI(self):
@@ -56,5 +100,8 @@ class Settings(BaseSettings):
         extra = "ignore"
 
 
-def get_settings():
-    return Settings()
+@lru_cache
+def get_settings() -> Settings:
+    # Parsed once per process; every module shares the same instance. The
+    # fields are read from the environment, which mypy cannot see.
+    return Settings()  # type: ignore[call-arg]
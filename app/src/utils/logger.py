@@ -1,5 +1,18 @@
+import atexit
+import copy
+import itertools
 import logging
+from logging.handlers import QueueHandler, QueueListener
 import os
+import queue
+from datetime import datetime, timezone
+from typing import Dict
+
+import orjson
+
+from utils.config import get_settings
+
+settings = get_settings()
 
 
 class CustomFormatter(logging.Formatter):
@@ -18,6 +31,75 @@ class CustomFormatter(logging.Formatter):
         return super().format(record)
 
 
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            "timestamp": datetime.fromtimestamp(
+                record.created, timezone.utc
+            ).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "function": record.funcName,
+            "message": record.getMessage(),
+        }
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        return orjson.dumps(entry).decode()
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Keeps one in every round(1 / rate) INFO and DEBUG records per logger
+    prefix. Warnings and errors are always kept.
+    """
+
+    def __init__(self, rates: Dict[str, float]):
+        super().__init__()
+        # Longest prefix first so "events.consumer" wins over "events".
+        self.every = {
+            name: max(1, round(1 / rate)) if rate > 0 else 0
+            for name, rate in sorted(rates.items(), key=lambda item: -len(item[0]))
+        }
+        self.counters = {name: itertools.count() for name in self.every}
+
+    def filter(self, record):
+        if record.levelno >= logging.WARNING:
+            return True
+        for name, every in self.every.items():
+            if record.name == name or record.name.startswith(f"{name}."):
+                return every > 0 and next(self.counters[name]) % every == 0
+        return True
+
+
+class LogQueueHandler(QueueHandler):
+    def prepare(self, record):
+        # Only merge the arguments into the message here; the traceback and
+        # the rest of the formatting are left to the listener thread.
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+
+def parse_sampling(value: str) -> Dict[str, float]:
+    """
+    Parses "events.consumer=0.01,repository=0.1" into {logger: rate}.
+    """
+    rates: Dict[str, float] = {}
+    for item in filter(None, (part.strip() for part in value.split(","))):
+        name, _, rate = item.partition("=")
+        rates[name.strip()] = float(rate)
+    return rates
+
+
+def build_formatter(log_format: str) -> logging.Formatter:
+    if log_format == "json":
+        return JsonFormatter()
+    return CustomFormatter(
+        "%(asctime)s[%(levelname)s][%(module)s.%(funcName)s][%(message)s]"
+    )
+
+
 def logger_config(module: str) -> logging.Logger:
     """
     LOGGER function. Extends Python logging module and sets a custom config.
@@ -25,20 +107,9 @@ def logger_config(module: str) -> logging.Logger:
     return: Logger object
     usage: logger_config(__name__)
     """
-    formatter = CustomFormatter(
-        "%(asctime)s[%(levelname)s][%(module)s.%(funcName)s][%(message)s]"
-    )
-
-    handler = logging.StreamHandler()
-    handler.setFormatter(formatter)
-
     logger = logging.getLogger(module)
     logger.setLevel(os.getenv("LOG_LEVEL", "DEBUG"))
 
-    # Avoid adding multiple handlers
-    if not logger.hasHandlers():
-        logger.addHandler(handler)
-
     # Suppress logging from other libraries
     logging.getLogger("sqlalchemy").setLevel(logging.WARNING)
     logging.getLogger("httpx").setLevel(logging.WARNING)
@@ -57,16 +128,20 @@ root_logger.setLevel(
     logging.WARNING
 )  # Set higher level to ignore other libraries' logs
 
-# Avoid adding multiple handlers to the root logger
-if not root_logger.hasHandlers():
-    root_logger.addHandler(
-        logging.StreamHandler()
-    )  # Add a handler if not already added
-
-# Apply custom formatting to root logger handlers
-for handler in root_logger.handlers:
-    handler.setFormatter(
-        CustomFormatter(
-            "%(asctime)s[%(levelname)s][%(module)s.%(funcName)s][%(message)s]"
-        )
-    )
+# Records are handed to a queue from the event loop; formatting and writing
+# to the stream happen on the listener thread.
+log_queue: queue.Queue = queue.Queue()
+
+stream_handler = logging.StreamHandler()
+stream_handler.setFormatter(build_formatter(settings.LOG_FORMAT))
+
+queue_handler = LogQueueHandler(log_queue)
+queue_handler.addFilter(SamplingFilter(parse_sampling(settings.LOG_SAMPLING)))
+
+for handler in list(root_logger.handlers):
+    root_logger.removeHandler(handler)
+root_logger.addHandler(queue_handler)
+
+listener = QueueListener(log_queue, stream_handler, respect_handler_level=True)
+listener.start()
+atexit.register(listener.stop)
@@ -0,0 +1,297 @@
+from bisect import bisect_left
+from functools import wraps
+import inspect
+from time import perf_counter
+from typing import Any, Callable, Dict, List, Sequence, Tuple
+
+# Upper bounds in seconds, from sub-millisecond up to the default pool timeout.
+DEFAULT_BUCKETS = (
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+    30.0,
+)
+
+
+class Histogram:
+    """
+    Fixed-bucket histogram. observe() is a bisect and three additions, so
+    it is cheap enough to call on every request.
+    """
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        cumulative = 0
+        buckets = {}
+        for bound, count in zip(self.buckets, self.counts):
+            cumulative += count
+            buckets[str(bound)] = cumulative
+        buckets["+Inf"] = self.count
+        return {"count": self.count, "sum": self.sum, "buckets": buckets}
+
+
+class Counter:
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0
+
+    def inc(self, amount: float = 1):
+        self.value += amount
+
+
+class Gauge:
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0
+
+    def inc(self, amount: float = 1):
+        self.value += amount
+
+    def dec(self, amount: float = 1):
+        self.value -= amount
+
+    def set(self, value: float):
+        self.value = value
+
+
+class CallbackGauge:
+    """
+    Gauge whose value is read from `function` when the registry is rendered.
+    """
+
+    __slots__ = ("function",)
+
+    def __init__(self, function: Callable[[], float]):
+        self.function = function
+
+    @property
+    def value(self) -> float:
+        return self.function()
+
+
+class MetricFamily:
+    """
+    A named metric with one child per combination of label values. Children
+    are created on first use and reused afterwards, so hot paths should bind
+    them once with labels() rather than on every call.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        kind: str,
+        help: str,
+        labelnames: Sequence[str],
+        factory: Callable[[], Any],
+    ):
+        self.name = name
+        self.kind = kind
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.factory = factory
+        self.children: Dict[Tuple[str, ...], Any] = {}
+
+    def labels(self, *values: Any) -> Any:
+        child = self.children.get(values)
+        if child is None:
+            if len(values) != len(self.labelnames):
+                raise ValueError(
+                    f"{self.name} expects labels {self.labelnames}, got {values}"
+                )
+            child = self.children[values] = self.factory()
+        return child
+
+
+def _format_labels(names: Sequence[str], values: Sequence[Any]) -> str:
+    if not names:
+        return ""
+    pairs = ",".join(
+        '{}="{}"'.format(
+            name,
+            str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"),
+        )
+        for name, value in zip(names, values)
+    )
+    return f"{{{pairs}}}"
+
+
+class Registry:
+    """
+    In-process metric registry rendered in the Prometheus text format.
+    Updating a metric is a few attribute updates on a preallocated object;
+    formatting is only paid for by render().
+    """
+
+    def __init__(self):
+        self.families: Dict[str, MetricFamily] = {}
+
+    def _family(
+        self,
+        name: str,
+        kind: str,
+        help: str,
+        labelnames: Sequence[str],
+        factory: Callable[[], Any],
+    ) -> MetricFamily:
+        if name in self.families:
+            raise ValueError(f"Metric {name} is already registered")
+        family = MetricFamily(name, kind, help, labelnames, factory)
+        self.families[name] = family
+        return family
+
+    def counter(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        family = self._family(name, "counter", help, labelnames, Counter)
+        return family if labelnames else family.labels()
+
+    def gauge(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        family = self._family(name, "gauge", help, labelnames, Gauge)
+        return family if labelnames else family.labels()
+
+    def histogram(
+        self,
+        name: str,
+        help: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ):
+        family = self._family(
+            name, "histogram", help, labelnames, lambda: Histogram(buckets)
+        )
+        return family if labelnames else family.labels()
+
+    def register(self, name: str, kind: str, help: str, metric: Any):
+        """
+        Exposes an existing unlabelled Counter, Gauge, CallbackGauge or
+        Histogram under `name`.
+        """
+        family = self._family(name, kind, help, (), lambda: metric)
+        family.labels()
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for family in self.families.values():
+            lines.append(f"# HELP {family.name} {family.help}")
+            lines.append(f"# TYPE {family.name} {family.kind}")
+            for values, metric in list(family.children.items()):
+                if family.kind == "histogram":
+                    lines.extend(
+                        self._render_histogram(family, values, metric.snapshot())
+                    )
+                else:
+                    labels = _format_labels(family.labelnames, values)
+                    lines.append(f"{family.name}{labels} {metric.value}")
+        lines.append("")
+        return "\n".join(lines)
+
+    @staticmethod
+    def _render_histogram(
+        family: MetricFamily, values: Tuple[str, ...], snapshot: Dict[str, Any]
+    ) -> List[str]:
+        names = family.labelnames + ("le",)
+        lines = [
+            f"{family.name}_bucket{_format_labels(names, values + (bound,))} {count}"
+            for bound, count in snapshot["buckets"].items()
+        ]
+        labels = _format_labels(family.labelnames, values)
+        lines.append(f"{family.name}_sum{labels} {snapshot['sum']}")
+        lines.append(f"{family.name}_count{labels} {snapshot['count']}")
+        return lines
+
+
+def timed(histogram: Histogram):
+    """
+    Decorator observing the duration of every call to an async function.
+    """
+
+    def decorator(function):
+        @wraps(function)
+        async def wrapper(*args, **kwargs):
+            started = perf_counter()
+            try:
+                return await function(*args, **kwargs)
+            finally:
+                histogram.observe(perf_counter() - started)
+
+        return wrapper
+
+    return decorator
+
+
+def timed_methods(family: MetricFamily):
+    """
+    Class decorator timing every async static method of a repository class,
+    labelled with the class and method name.
+    """
+
+    def decorator(cls):
+        for name, attribute in list(vars(cls).items()):
+            if isinstance(attribute, staticmethod) and inspect.iscoroutinefunction(
+                attribute.__func__
+            ):
+                histogram = family.labels(f"{cls.__name__}.{name}")
+                setattr(cls, name, staticmethod(timed(histogram)(attribute.__func__)))
+        return cls
+
+    return decorator
+
+
+registry = Registry()
+
+graphql_operation_seconds = registry.histogram(
+    "graphql_operation_seconds",
+    "Time spent resolving a GraphQL operation",
+    ("operation",),
+)
+repository_call_seconds = registry.histogram(
+    "repository_call_seconds",
+    "Time spent in a repository method",
+    ("method",),
+)
+consumer_messages = registry.counter(
+    "consumer_messages_total",
+    "Messages received by the consumer",
+    ("event_type",),
+)
+consumer_handling_seconds = registry.histogram(
+    "consumer_handling_seconds",
+    "Time spent handling a message, or a batch of score_created messages",
+    ("event_type",),
+)
+consumer_in_flight = registry.gauge(
+    "consumer_in_flight",
+    "Messages received but not yet acknowledged or rejected",
+    ("event_type",),
+)
+publisher_publish_seconds = registry.histogram(
+    "publisher_publish_seconds",
+    "Time spent publishing a message, or a batch of buffered messages",
+)
+publisher_messages = registry.counter(
+    "publisher_messages_total", "Messages confirmed by the exchange"
+)
+publisher_failures = registry.counter(
+    "publisher_failures_total", "Messages the exchange failed to confirm"
+)
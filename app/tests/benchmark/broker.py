@@ -0,0 +1,270 @@
+"""
+In-memory stand-in for RabbitMQ, implementing the subset of the aio_pika
+connection, channel, exchange and queue API that `Publisher` and `Consumer`
+use. Messages are delivered on the event loop with the channel's prefetch
+limit, so the real consumer and publisher code runs unchanged. Queue TTLs
+and dead-lettering are not emulated: rejected messages are dropped.
+"""
+
+import asyncio
+from contextlib import asynccontextmanager
+from time import perf_counter
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+from uuid import uuid4
+
+import aio_pika
+from aio_pika import ExchangeType
+
+
+class InMemoryIncomingMessage:
+    def __init__(
+        self, queue: "InMemoryQueue", message: aio_pika.Message, delivery: "Delivery"
+    ):
+        self.queue = queue
+        self.body = message.body
+        self.content_type = message.content_type
+        self.headers = dict(message.headers or {})
+        self.message = message
+        self.delivery = delivery
+        self.settled = False
+
+    def _settle(self, requeue: bool = False):
+        if self.settled:
+            raise RuntimeError("Message was already acknowledged or rejected")
+        self.settled = True
+        self.queue.release()
+        if requeue:
+            self.queue.put(self.message, self.delivery)
+        else:
+            self.delivery.settle()
+
+    async def ack(self):
+        self._settle()
+
+    async def reject(self, requeue: bool = False):
+        self._settle(requeue)
+
+    async def nack(self, requeue: bool = True):
+        await self.reject(requeue)
+
+    @asynccontextmanager
+    async def process(self):
+        try:
+            yield self
+        except Exception:
+            await self.reject()
+            raise
+        else:
+            await self.ack()
+
+
+class Delivery:
+    """
+    Tracks one published message across every queue it was routed to.
+    """
+
+    def __init__(self):
+        self.published_at = perf_counter()
+        self.pending = 0
+        self.done: Optional[asyncio.Future] = None
+
+    def settle(self):
+        self.pending -= 1
+        if self.pending == 0 and self.done is not None and not self.done.done():
+            self.done.set_result(perf_counter() - self.published_at)
+
+
+class InMemoryQueue:
+    def __init__(self, broker: "InMemoryBroker", name: str):
+        self.broker = broker
+        self.name = name
+        self.messages: asyncio.Queue = asyncio.Queue()
+        self.consumers: Dict[str, asyncio.Task] = {}
+        self.credit: Optional[asyncio.Semaphore] = None
+        self.unacked = 0
+
+    def put(self, message: aio_pika.Message, delivery: Delivery):
+        self.messages.put_nowait((message, delivery))
+
+    def release(self):
+        self.unacked -= 1
+        if self.credit is not None:
+            self.credit.release()
+
+    async def bind(self, exchange: "InMemoryExchange", routing_key: str = ""):
+        exchange.bindings.append((self, routing_key))
+
+    async def consume(
+        self,
+        callback: Callable[[InMemoryIncomingMessage], Awaitable[Any]],
+        no_ack: bool = False,
+        prefetch_count: int = 0,
+    ) -> str:
+        tag = uuid4().hex
+        if prefetch_count:
+            self.credit = asyncio.Semaphore(prefetch_count)
+        self.consumers[tag] = asyncio.create_task(self._deliver(callback))
+        return tag
+
+    async def _deliver(self, callback):
+        tasks: Set[asyncio.Task] = set()
+        while True:
+            if self.credit is not None:
+                await self.credit.acquire()
+            message, delivery = await self.messages.get()
+            self.unacked += 1
+            incoming = InMemoryIncomingMessage(self, message, delivery)
+            # aio_pika runs each delivery as its own task, bounded by prefetch.
+            task = asyncio.create_task(callback(incoming))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+
+    async def cancel(self, consumer_tag: str):
+        task = self.consumers.pop(consumer_tag, None)
+        if task is not None:
+            task.cancel()
+
+    async def get(self, no_ack: bool = False, fail: bool = True):
+        try:
+            message, delivery = self.messages.get_nowait()
+        except asyncio.QueueEmpty:
+            if fail:
+                raise
+            return None
+        self.unacked += 1
+        return InMemoryIncomingMessage(self, message, delivery)
+
+    @property
+    def idle(self) -> bool:
+        return not self.consumers or (self.messages.empty() and self.unacked == 0)
+
+
+class InMemoryExchange:
+    def __init__(self, broker: "InMemoryBroker", name: str, type: ExchangeType):
+        self.broker = broker
+        self.name = name
+        self.type = type
+        self.bindings: List[Tuple[InMemoryQueue, str]] = []
+
+    def route(self, routing_key: str) -> List[InMemoryQueue]:
+        if self.name == "":
+            queue = self.broker.queues.get(routing_key)
+            return [queue] if queue else []
+        if self.type == ExchangeType.FANOUT:
+            return [queue for queue, _ in self.bindings]
+        return [queue for queue, key in self.bindings if key == routing_key]
+
+    async def publish(
+        self, message: aio_pika.Message, routing_key: str = "", **kwargs
+    ) -> Delivery:
+        delivery = Delivery()
+        queues = self.route(routing_key)
+        delivery.pending = len(queues)
+        for queue in queues:
+            queue.put(message, delivery)
+        self.broker.published += 1
+        return delivery
+
+
+class InMemoryChannel:
+    def __init__(self, broker: "InMemoryBroker"):
+        self.broker = broker
+        self.prefetch_count = 0
+
+    async def set_qos(self, prefetch_count: int = 0, **kwargs):
+        self.prefetch_count = prefetch_count
+
+    async def declare_exchange(
+        self, name: str, type: ExchangeType = ExchangeType.DIRECT, **kwargs
+    ) -> InMemoryExchange:
+        return self.broker.exchange(name, type)
+
+    async def declare_queue(
+        self, name: Optional[str] = None, **kwargs
+    ) -> "InMemoryChannelQueue":
+        return InMemoryChannelQueue(self, self.broker.queue(name))
+
+    @property
+    def default_exchange(self) -> InMemoryExchange:
+        return self.broker.exchange("", ExchangeType.DIRECT)
+
+
+class InMemoryChannelQueue:
+    """
+    A queue as seen from a channel, so consume() applies its prefetch.
+    """
+
+    def __init__(self, channel: InMemoryChannel, queue: InMemoryQueue):
+        self.channel = channel
+        self.queue = queue
+        self.name = queue.name
+
+    async def bind(self, exchange: InMemoryExchange, routing_key: str = ""):
+        await self.queue.bind(exchange, routing_key)
+
+    async def consume(self, callback, no_ack: bool = False) -> str:
+        return await self.queue.consume(
+            callback, no_ack, prefetch_count=self.channel.prefetch_count
+        )
+
+    async def cancel(self, consumer_tag: str):
+        await self.queue.cancel(consumer_tag)
+
+    async def get(self, no_ack: bool = False, fail: bool = True):
+        return await self.queue.get(no_ack, fail)
+
+
+class InMemoryConnection:
+    def __init__(self, broker: "InMemoryBroker"):
+        self.broker = broker
+
+    async def channel(self, publisher_confirms: bool = True) -> InMemoryChannel:
+        return InMemoryChannel(self.broker)
+
+    async def close(self):
+        pass
+
+
+class InMemoryBroker:
+    def __init__(self):
+        self.exchanges: Dict[str, InMemoryExchange] = {}
+        self.queues: Dict[str, InMemoryQueue] = {}
+        self.published = 0
+
+    def connection(self) -> InMemoryConnection:
+        return InMemoryConnection(self)
+
+    def exchange(self, name: str, type: ExchangeType) -> InMemoryExchange:
+        if name not in self.exchanges:
+            self.exchanges[name] = InMemoryExchange(self, name, type)
+        return self.exchanges[name]
+
+    def queue(self, name: Optional[str] = None) -> InMemoryQueue:
+        name = name or f"amq.gen-{uuid4().hex}"
+        if name not in self.queues:
+            self.queues[name] = InMemoryQueue(self, name)
+        return self.queues[name]
+
+    async def send(
+        self,
+        exchange_name: str,
+        message: aio_pika.Message,
+        routing_key: str = "",
+    ) -> "asyncio.Future[float]":
+        """
+        Publishes as another service would. The returned future resolves to
+        the seconds from publishing until every queue the message was routed
+        to has acknowledged or rejected it.
+        """
+        delivery = await self.exchanges[exchange_name].publish(message, routing_key)
+        delivery.done = asyncio.get_running_loop().create_future()
+        if delivery.pending == 0:
+            delivery.done.set_result(0.0)
+        return delivery.done
+
+    async def join(self, poll_interval: float = 0.01):
+        """
+        Waits until every consumed queue is empty and fully acknowledged.
+        """
+        while not all(queue.idle for queue in self.queues.values()):
+            await asyncio.sleep(poll_interval)
@@ -0,0 +1,94 @@
+import asyncio
+import json
+import os
+import sys
+from statistics import median
+from time import perf_counter
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+SRC_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "../../src")
+if SRC_PATH not in sys.path:
+    sys.path.insert(0, SRC_PATH)
+
+# Console logging would dominate the measurements; set LOG_LEVEL to
+# benchmark with it.
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+
+def percentile(samples: List[float], fraction: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(fraction * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def summarize(latencies: List[float], elapsed: float) -> Dict[str, float]:
+    """
+    latencies and elapsed are in seconds, the summary is reported in
+    operations per second and milliseconds.
+    """
+    return {
+        "ops": len(latencies),
+        "throughput": len(latencies) / elapsed if elapsed else 0.0,
+        "p50_ms": median(latencies) * 1000 if latencies else 0.0,
+        "p99_ms": percentile(latencies, 0.99) * 1000,
+    }
+
+
+async def run_concurrently(
+    operation: Callable[[int], Awaitable[Any]], count: int, concurrency: int
+) -> Dict[str, float]:
+    """
+    Calls operation(0) .. operation(count - 1) from `concurrency` tasks and
+    summarizes the latency of each call.
+    """
+    latencies: List[float] = []
+    indexes = iter(range(count))
+
+    async def worker():
+        for index in indexes:
+            started = perf_counter()
+            await operation(index)
+            latencies.append(perf_counter() - started)
+
+    started = perf_counter()
+    await asyncio.gather(*(worker() for _ in range(max(1, concurrency))))
+    return summarize(latencies, perf_counter() - started)
+
+
+def load_baseline(path: str) -> Optional[Dict[str, Any]]:
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_baseline(path: str, params: Dict[str, Any], results: Dict[str, Dict]):
+    with open(path, "w") as f:
+        json.dump({"params": params, "results": results}, f, indent=2, sort_keys=True)
+        f.write("\n")
+
+
+def find_regressions(
+    baseline: Dict[str, Dict], results: Dict[str, Dict], tolerance: float
+) -> Dict[str, List[str]]:
+    """
+    Flags scenarios whose throughput dropped or whose p99 latency grew by
+    more than `tolerance` (a fraction) against the baseline.
+    """
+    regressions: Dict[str, List[str]] = {}
+    for name, result in results.items():
+        before = baseline.get(name)
+        if not before:
+            continue
+        reasons = []
+        if result["throughput"] < before["throughput"] * (1 - tolerance):
+            reasons.append(
+                f"throughput {before['throughput']:.1f} -> {result['throughput']:.1f}/s"
+            )
+        if result["p99_ms"] > before["p99_ms"] * (1 + tolerance):
+            reasons.append(f"p99 {before['p99_ms']:.2f} -> {result['p99_ms']:.2f}ms")
+        if reasons:
+            regressions[name] = reasons
+    return regressions
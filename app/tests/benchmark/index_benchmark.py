@@ -0,0 +1,157 @@
+"""
+Query-plan and latency benchmark for the v0002 composite key migration.
+
+Builds the pre-migration schema in a scratch PostgreSQL schema, loads it
+with generated rows (1M player ratings and 2M scores by default), runs the
+hot lookups, applies the migration and runs them again.
+
+usage (from app/): python -m tests.benchmark.index_benchmark [--players N]
+"""
+
+import argparse
+import asyncio
+import random
+from time import perf_counter
+from typing import Dict, List
+
+from tests.benchmark.common import summarize
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection, create_async_engine
+
+from data.migrations import v0001_initial, v0002_composite_keys
+from utils.config import get_settings
+
+settings = get_settings()
+
+SCHEMA = "bench_indexes"
+
+QUERIES = {
+    "rating_by_player_and_team": (
+        "SELECT * FROM player_ratings WHERE player_id = :player_id AND team_id = :team_id"
+    ),
+    "players_by_team": (
+        "SELECT player_id, average_score FROM player_ratings WHERE team_id = :team_id"
+    ),
+    "team_page_by_average": (
+        "SELECT player_id, average_score FROM player_ratings WHERE team_id = :team_id "
+        "ORDER BY average_score DESC, player_id DESC LIMIT 50"
+    ),
+    "player_latest_scores": (
+        "SELECT score, created_at FROM scores WHERE player_id = :player_id "
+        "ORDER BY created_at DESC LIMIT 10"
+    ),
+}
+
+
+async def load_data(conn: AsyncConnection, players: int, teams: int, scores: int):
+    await conn.execute(
+        text(
+            "INSERT INTO player_ratings "
+            "(player_id, team_id, average_score, total_of_scores, last_updated) "
+            "SELECT g, g % :teams, 1 + random() * 9, 3, now() "
+            "FROM generate_series(1, :players) g"
+        ),
+        {"players": players, "teams": teams},
+    )
+    await conn.execute(
+        text(
+            "INSERT INTO scores (player_id, team_id, score, created_at) "
+            "SELECT p, p % :teams, 1 + floor(random() * 10)::int, "
+            "now() - random() * interval '365 days' "
+            "FROM (SELECT 1 + g % :players AS p FROM generate_series(1, :scores) g) s"
+        ),
+        {"players": players, "teams": teams, "scores": scores},
+    )
+    await conn.execute(text("ANALYZE"))
+
+
+async def run_queries(
+    conn: AsyncConnection, players: int, teams: int, iterations: int
+) -> Dict[str, Dict]:
+    results = {}
+    for name, query in QUERIES.items():
+        player_id = random.randint(1, players)
+        params = {"player_id": player_id, "team_id": player_id % teams}
+        plan = await conn.execute(text(f"EXPLAIN (ANALYZE, BUFFERS) {query}"), params)
+        latencies: List[float] = []
+        started = perf_counter()
+        for _ in range(iterations):
+            player_id = random.randint(1, players)
+            params = {"player_id": player_id, "team_id": player_id % teams}
+            t0 = perf_counter()
+            await conn.execute(text(query), params)
+            latencies.append(perf_counter() - t0)
+        results[name] = {
+            "plan": [row[0] for row in plan],
+            **summarize(latencies, perf_counter() - started),
+        }
+    return results
+
+
+def report(title: str, results: Dict[str, Dict]):
+    print(f"\n=== {title}")
+    for name, result in results.items():
+        print(f"{name:<28} p50={result['p50_ms']:9.3f}ms p99={result['p99_ms']:9.3f}ms")
+        for line in result["plan"]:
+            print(f"    {line}")
+
+
+async def main(args):
+    engine = create_async_engine(args.database_url)
+    teams = max(1, args.players // args.team_size)
+    scores = args.players * args.scores_per_player
+    async with engine.connect() as conn:
+        await conn.execute(text(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE"))
+        await conn.execute(text(f"CREATE SCHEMA {SCHEMA}"))
+        await conn.execute(text(f"SET search_path TO {SCHEMA}"))
+        await v0001_initial.upgrade(conn)
+        await conn.commit()
+
+        t0 = perf_counter()
+        await load_data(conn, args.players, teams, scores)
+        await conn.commit()
+        print(
+            f"Loaded {args.players} player ratings, {scores} scores and {teams} teams "
+            f"in {perf_counter() - t0:.1f}s"
+        )
+
+        before = await run_queries(conn, args.players, teams, args.iterations)
+        await conn.commit()
+        report("Before v0002 (player_id primary key, no indexes)", before)
+
+        t0 = perf_counter()
+        await v0002_composite_keys.upgrade(conn)
+        # build_indexes() builds these with CREATE INDEX CONCURRENTLY;
+        # nothing else uses the scratch schema, so a plain build will do.
+        for name, definition in v0002_composite_keys.INDEXES.items():
+            await conn.execute(text(f"CREATE INDEX {name} {definition}"))
+        await conn.execute(text("ANALYZE"))
+        await conn.commit()
+        print(f"\nApplied v0002 in {perf_counter() - t0:.1f}s")
+
+        after = await run_queries(conn, args.players, teams, args.iterations)
+        await conn.commit()
+        report("After v0002 (composite key, covering indexes)", after)
+
+        print("\n=== Summary (p50 ms before -> after)")
+        for name in QUERIES:
+            print(
+                f"{name:<28} {before[name]['p50_ms']:9.3f} -> {after[name]['p50_ms']:9.3f}"
+            )
+
+        if not args.keep:
+            await conn.execute(text(f"DROP SCHEMA {SCHEMA} CASCADE"))
+            await conn.commit()
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--database-url", default=settings.SQLALCHEMY_DATABASE_URI)
+    parser.add_argument("--players", type=int, default=1_000_000)
+    parser.add_argument("--team-size", type=int, default=25)
+    parser.add_argument("--scores-per-player", type=int, default=2)
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--keep", action="store_true", help="keep the scratch schema")
+    asyncio.run(main(parser.parse_args()))
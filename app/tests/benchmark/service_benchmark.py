@@ -0,0 +1,280 @@
+"""
+End-to-end throughput and latency benchmark for the rating service.
+
+Runs the real app, consumer, publisher and outbox relay against a scratch
+PostgreSQL schema and an in-memory broker, and measures:
+
+    rate_players        GraphQL mutations through the ASGI app
+    get_players_rating  GraphQL reads through the ASGI app
+    player_created      events published to the exchange until acked
+    score_created       events published to the exchange until acked
+
+Results are compared with the baseline in baseline.json: the run exits
+with 1 when a scenario regressed past --tolerance, and with 2 when the
+baseline was recorded with other parameters and cannot be compared.
+
+usage (from app/):
+    DB_HOST=localhost python -m tests.benchmark.service_benchmark [--save-baseline]
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import sys
+from time import perf_counter
+from typing import Any, Dict
+
+from tests.benchmark.common import (
+    find_regressions,
+    load_baseline,
+    run_concurrently,
+    save_baseline,
+)
+from tests.benchmark.broker import InMemoryBroker
+
+import aio_pika
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy import event, text
+
+from data.migrations import build_indexes, migrate
+from data.session import db
+from events.codec import encode
+from events.consumer import Consumer, local_event_types
+from events.outbox import outbox_relay
+from events.publisher import Publisher
+from main import app, running
+from utils.config import get_settings
+
+settings = get_settings()
+
+SCHEMA = "bench_service"
+
+BASELINE_PATH = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "baseline.json"
+)
+
+RATE_PLAYERS = """
+mutation ($team_rating: TeamRatingInput!) {
+  rate_players(team_rating: $team_rating) { team_id }
+}
+"""
+
+GET_PLAYERS_RATING = """
+query ($team_id: Int!) {
+  get_players_rating(team_id: $team_id) {
+    team_id
+    players_data { player_id player_average_rating }
+  }
+}
+"""
+
+
+def use_schema(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    cursor.execute(f"SET search_path TO {SCHEMA}")
+    cursor.close()
+
+
+async def reset_schema():
+    async with db.engine.begin() as conn:
+        await conn.execute(text(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE"))
+        await conn.execute(text(f"CREATE SCHEMA {SCHEMA}"))
+
+
+async def drop_schema():
+    async with db.engine.begin() as conn:
+        await conn.execute(text(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE"))
+
+
+async def graphql(client: AsyncClient, query: str, variables: Dict[str, Any]):
+    response = await client.post(
+        f"{settings.API_PREFIX}/graphql",
+        json={"query": query, "variables": variables},
+    )
+    body = response.json()
+    if response.status_code != 200 or body.get("errors"):
+        raise Exception(f"GraphQL request failed: {body}")
+    return body["data"]
+
+
+async def settle(broker: InMemoryBroker, publisher: Publisher):
+    """
+    Waits for the outbox, the publisher buffer and every consumed queue to
+    drain, so one scenario's follow-up work does not leak into the next.
+    """
+    for _ in range(2):
+        await outbox_relay.drain()
+        await publisher.flush()
+        await broker.join()
+
+
+async def bench_rate_players(client: AsyncClient, args) -> Dict[str, float]:
+    async def rate(index: int):
+        team_id = 1 + index % args.teams
+        await graphql(
+            client,
+            RATE_PLAYERS,
+            {
+                "team_rating": {
+                    "team_id": team_id,
+                    "players_data": [
+                        {"player_id": player_id, "player_score": random.randint(1, 10)}
+                        for player_id in range(1, args.team_size + 1)
+                    ],
+                }
+            },
+        )
+
+    return await run_concurrently(rate, args.requests, args.concurrency)
+
+
+async def bench_get_players_rating(client: AsyncClient, args) -> Dict[str, float]:
+    async def read(index: int):
+        await graphql(
+            client, GET_PLAYERS_RATING, {"team_id": random.randint(1, args.teams)}
+        )
+
+    return await run_concurrently(read, args.reads, args.concurrency)
+
+
+async def bench_stream(
+    broker: InMemoryBroker, event_type: str, make_data, args
+) -> Dict[str, float]:
+    async def send(index: int):
+        body, content_type = encode(
+            {"event_type": event_type, "data": make_data(index)}
+        )
+        acked = await broker.send(
+            settings.EXCHANGE_NAME,
+            aio_pika.Message(body=body, content_type=content_type),
+        )
+        await acked
+
+    return await run_concurrently(send, args.messages, args.stream_concurrency)
+
+
+def report(results: Dict[str, Dict], baseline, regressions, tolerance: float):
+    print(f"\n{'scenario':<20} {'ops':>7} {'ops/s':>10} {'p50 ms':>9} {'p99 ms':>9}")
+    for name, result in results.items():
+        line = (
+            f"{name:<20} {result['ops']:>7} {result['throughput']:>10.1f} "
+            f"{result['p50_ms']:>9.2f} {result['p99_ms']:>9.2f}"
+        )
+        before = (baseline or {}).get("results", {}).get(name)
+        if before:
+            line += (
+                f"   baseline {before['throughput']:.1f}/s p99 {before['p99_ms']:.2f}ms"
+            )
+        if name in regressions:
+            line += "   REGRESSION: " + ", ".join(regressions[name])
+        print(line)
+    if baseline is None:
+        print("\nNo baseline yet, run with --save-baseline to record one.")
+    elif regressions:
+        print(
+            f"\n{len(regressions)} scenario(s) regressed by more than {tolerance:.0%}"
+        )
+
+
+async def main(args) -> int:
+    random.seed(args.seed)
+    params = {
+        key: value
+        for key, value in vars(args).items()
+        if key not in ("baseline", "save_baseline", "keep", "tolerance")
+    }
+
+    event.listen(db.engine.sync_engine, "connect", use_schema)
+    await reset_schema()
+    await migrate(db.engine)
+    await build_indexes(db.engine)
+
+    broker = InMemoryBroker()
+    consumer = Consumer(broker.connection(), local_event_types=local_event_types())
+    await consumer.connect()
+    publisher = Publisher(broker.connection())
+    await publisher.connect()
+
+    results: Dict[str, Dict] = {}
+    started = perf_counter()
+    try:
+        async with running(app, consumer, publisher):
+            transport = ASGITransport(app=app)
+            async with AsyncClient(
+                transport=transport, base_url="http://benchmark"
+            ) as client:
+                results["rate_players"] = await bench_rate_players(client, args)
+                await settle(broker, publisher)
+                results["get_players_rating"] = await bench_get_players_rating(
+                    client, args
+                )
+            results["player_created"] = await bench_stream(
+                broker,
+                "player_created",
+                lambda index: {
+                    "team_id": 1 + index % args.teams,
+                    "player_id": args.team_size + 1 + index,
+                },
+                args,
+            )
+            await settle(broker, publisher)
+            results["score_created"] = await bench_stream(
+                broker,
+                "score_created",
+                lambda index: {
+                    "team_id": 1 + index % args.teams,
+                    "player_id": 1 + index % args.team_size,
+                    "score": random.randint(1, 10),
+                },
+                args,
+            )
+            await settle(broker, publisher)
+    finally:
+        if not args.keep:
+            await drop_schema()
+        await db.close_database()
+    print(f"Finished in {perf_counter() - started:.1f}s")
+
+    baseline = load_baseline(args.baseline)
+    regressions = {}
+    comparable = baseline is None or baseline.get("params") == params
+    if baseline is not None and not comparable:
+        print(
+            "Baseline was recorded with different parameters "
+            f"{baseline['params']}, results are not comparable. Pass --baseline "
+            "to compare with another file, or --save-baseline to record one."
+        )
+    elif baseline is not None:
+        regressions = find_regressions(baseline["results"], results, args.tolerance)
+    report(results, baseline, regressions, args.tolerance)
+
+    if args.save_baseline:
+        save_baseline(args.baseline, params, results)
+        print(f"Baseline saved to {args.baseline}")
+        return 0
+    if not comparable:
+        return 2
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--teams", type=int, default=50)
+    parser.add_argument("--team-size", type=int, default=20)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--reads", type=int, default=5000)
+    parser.add_argument("--messages", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--stream-concurrency", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.2,
+        help="flag a regression past this fraction (default 0.2)",
+    )
+    parser.add_argument("--keep", action="store_true", help="keep the scratch schema")
+    sys.exit(asyncio.run(main(parser.parse_args())))
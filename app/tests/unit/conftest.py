@@ -0,0 +1,32 @@
+from contextlib import asynccontextmanager
+import os
+import sys
+
+import pytest
+
+SRC_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "../../src")
+if SRC_PATH not in sys.path:
+    sys.path.insert(0, SRC_PATH)
+
+
+class Database:
+    """Stands in for data.session.db; its units of work carry no session."""
+
+    @asynccontextmanager
+    async def unit_of_work(self):
+        yield None
+
+
+@pytest.fixture
+def fake_database(monkeypatch):
+    """
+    Returns a function that replaces `db` in a module with a `Database` and
+    any keyword arguments with the given fakes, e.g. its repositories.
+    """
+
+    def patch(module, **fakes):
+        monkeypatch.setattr(module, "db", Database())
+        for name, fake in fakes.items():
+            monkeypatch.setattr(module, name, fake)
+
+    return patch
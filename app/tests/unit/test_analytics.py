@@ -0,0 +1,58 @@
+import numpy as np
+import pytest
+
+from service.analytics_service import (
+    rank_and_percentile,
+    rating_arrays,
+    team_analytics,
+    with_team_slice,
+)
+
+
+@pytest.fixture
+def league():
+    # Team 1 scores 1..5, team 2 scores 6 and 7.
+    return rating_arrays(
+        [1, 1, 1, 1, 1, 2, 2], [1, 2, 3, 4, 5, 6, 7], [1, 2, 3, 4, 5, 6, 7]
+    )
+
+
+def test_rank_and_percentile_share_ranks_and_count_ties_half():
+    ranks, percentiles = rank_and_percentile(
+        np.array([1.0, 2.0, 2.0, 3.0]), np.array([3.0, 2.0, 1.0])
+    )
+
+    assert ranks.tolist() == [1, 2, 4]
+    assert percentiles.tolist() == [87.5, 50.0, 12.5]
+
+
+def test_team_analytics_computes_percentiles_ranks_and_histogram(league):
+    analytics = team_analytics(1, *league, bins=3)
+
+    assert analytics.player_count == 5
+    assert analytics.mean == 3
+    assert (analytics.p25, analytics.median, analytics.p75) == (2, 3, 4)
+    assert analytics.p90 == pytest.approx(4.6)
+    assert [
+        (bucket.lower, bucket.upper, bucket.count) for bucket in analytics.histogram
+    ] == [(1, 3, 2), (3, 5, 2), (5, 7, 1)]
+
+    best = analytics.players_data[0]
+    assert [player.player_id for player in analytics.players_data] == [5, 4, 3, 2, 1]
+    assert (best.team_rank, best.team_percentile) == (1, 90)
+    assert best.league_rank == 3
+    assert best.league_percentile == pytest.approx((4 + 5) / 14 * 100)
+
+
+def test_team_analytics_is_none_for_a_team_without_ratings(league):
+    assert team_analytics(3, *league, bins=3) is None
+
+
+def test_with_team_slice_replaces_only_that_teams_rows(league):
+    team_ids, player_ids, scores = with_team_slice(
+        league, 2, rating_arrays([2], [6], [9.5])
+    )
+
+    assert team_ids.tolist() == [1, 1, 1, 1, 1, 2]
+    assert player_ids.tolist() == [1, 2, 3, 4, 5, 6]
+    assert scores.tolist() == [1, 2, 3, 4, 5, 9.5]
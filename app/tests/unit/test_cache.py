@@ -0,0 +1,138 @@
+import pytest
+
+from utils import cache as cache_module
+from utils.cache import TTLCache
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(cache_module, "monotonic", lambda: now[0])
+    return now
+
+
+def test_get_returns_stored_values_and_counts_hits_and_misses():
+    cache = TTLCache(max_size=2, ttl_seconds=30)
+
+    assert cache.get("team:1") is None
+    cache.set("team:1", [1, 2])
+
+    assert cache.get("team:1") == [1, 2]
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+
+
+def test_entries_expire_after_the_ttl(clock):
+    cache = TTLCache(max_size=2, ttl_seconds=30)
+    cache.set("team:1", "ratings")
+
+    clock[0] += 30
+    assert cache.get("team:1") == "ratings"
+    clock[0] += 0.1
+    assert cache.get("team:1") is None
+    assert cache.stats()["size"] == 0
+
+
+def test_set_refreshes_the_ttl(clock):
+    cache = TTLCache(max_size=2, ttl_seconds=30)
+    cache.set("team:1", "old")
+    clock[0] += 20
+    cache.set("team:1", "new")
+    clock[0] += 20
+
+    assert cache.get("team:1") == "new"
+
+
+def test_least_recently_used_entry_is_evicted_first():
+    cache = TTLCache(max_size=2, ttl_seconds=30)
+    cache.set("team:1", 1)
+    cache.set("team:2", 2)
+    cache.get("team:1")
+    cache.set("team:3", 3)
+
+    assert cache.get("team:2") is None
+    assert cache.get("team:1") == 1
+    assert cache.get("team:3") == 3
+    assert cache.stats()["evictions"] == 1
+
+
+def test_zero_max_size_disables_caching():
+    cache = TTLCache(max_size=0, ttl_seconds=30)
+    cache.set("team:1", 1)
+
+    assert cache.get("team:1") is None
+
+
+def test_invalidate_drops_the_entry_and_bumps_its_version():
+    cache = TTLCache(max_size=2, ttl_seconds=30)
+    cache.set("team:1", 1)
+
+    cache.invalidate("team:1")
+
+    assert cache.get("team:1") is None
+    assert cache.version("team:1") == 1
+    assert cache.version("team:2") == 0
+    assert cache.stats()["invalidations"] == 1
+
+
+def test_set_with_a_stale_version_is_ignored():
+    cache = TTLCache(max_size=2, ttl_seconds=30)
+    version = cache.version("team:1")
+    # The value was loaded before this invalidation, so it must not be cached.
+    cache.invalidate("team:1")
+
+    cache.set("team:1", "stale", version=version)
+    assert cache.get("team:1") is None
+
+    cache.set("team:1", "fresh", version=cache.version("team:1"))
+    assert cache.get("team:1") == "fresh"
+
+
+def test_clear_invalidates_every_entry():
+    cache = TTLCache(max_size=2, ttl_seconds=30)
+    cache.set("team:1", 1)
+    cache.set("team:2", 2)
+    version = cache.version("team:1")
+
+    cache.clear()
+
+    assert cache.stats()["size"] == 0
+    cache.set("team:1", 1, version=version)
+    assert cache.get("team:1") is None
+
+
+def test_versions_are_dropped_with_expired_and_evicted_entries(clock):
+    cache = TTLCache(max_size=2, ttl_seconds=30)
+    for team_id in (1, 2):
+        cache.invalidate(f"team:{team_id}")
+        cache.set(f"team:{team_id}", team_id, version=cache.version(f"team:{team_id}"))
+
+    cache.set("team:3", 3)
+    assert "team:1" not in cache.versions
+    clock[0] += 31
+    assert cache.get("team:2") is None
+    assert cache.versions == {}
+
+
+def test_versions_stay_bounded_by_max_size():
+    cache = TTLCache(max_size=2, ttl_seconds=30)
+
+    for team_id in range(100):
+        cache.invalidate(f"team:{team_id}")
+
+    assert cache.stats()["versions"] == 2
+
+
+def test_a_dropped_version_still_refuses_values_loaded_before_it():
+    cache = TTLCache(max_size=1, ttl_seconds=30)
+    version = cache.version("team:1")
+    cache.invalidate("team:1")
+    # Invalidating another team drops the version of team 1.
+    cache.invalidate("team:2")
+
+    assert "team:1" not in cache.versions
+    cache.set("team:1", "stale", version=version)
+    assert cache.get("team:1") is None
+
+    cache.set("team:1", "fresh", version=cache.version("team:1"))
+    assert cache.get("team:1") == "fresh"
@@ -0,0 +1,98 @@
+from datetime import datetime, timezone
+
+import msgpack  # type: ignore
+import pytest
+
+from events.codec import (
+    CODECS,
+    JSON_CONTENT_TYPE,
+    MSGPACK_CONTENT_TYPE,
+    EventDecodeError,
+    decode,
+    encode,
+    get_codec,
+)
+
+MESSAGE = {"event_type": "score_created", "data": {"player_id": 1, "score": 7}}
+
+
+@pytest.mark.parametrize("name", ["json", "msgpack"])
+def test_encode_round_trips_through_decode(name):
+    body, content_type = encode(MESSAGE, get_codec(name))
+
+    assert content_type == CODECS[name].content_type
+    assert decode(body, content_type) == MESSAGE
+
+
+def test_encode_serializes_datetimes_as_iso_strings():
+    created_at = datetime(2024, 1, 2, 3, 4, 5, tzinfo=timezone.utc)
+
+    for codec in CODECS.values():
+        body, content_type = encode({"created_at": created_at}, codec)
+
+        assert decode(body, content_type) == {"created_at": created_at.isoformat()}
+
+
+def test_get_codec_rejects_unknown_names():
+    with pytest.raises(ValueError):
+        get_codec("xml")
+
+
+@pytest.mark.parametrize(
+    "content_type", [None, "", "text/plain", "application/octet-stream"]
+)
+def test_decode_falls_back_to_json_for_missing_or_unknown_content_types(
+    content_type,
+):
+    assert decode(b'{"event_type": "player_created"}', content_type) == {
+        "event_type": "player_created"
+    }
+
+
+@pytest.mark.parametrize(
+    "content_type",
+    ["application/json; charset=utf-8", "Application/JSON", " application/json "],
+)
+def test_decode_ignores_parameters_and_case_of_the_content_type(content_type):
+    assert decode(b'{"event_type": "player_created"}', content_type) == {
+        "event_type": "player_created"
+    }
+
+
+def test_decode_reads_msgpack_by_content_type():
+    body = msgpack.packb(MESSAGE, use_bin_type=True)
+
+    assert decode(body, f"{MSGPACK_CONTENT_TYPE}; charset=binary") == MESSAGE
+
+
+def test_decode_does_not_guess_msgpack_without_its_content_type():
+    body = msgpack.packb(MESSAGE, use_bin_type=True)
+
+    with pytest.raises(EventDecodeError):
+        decode(body, JSON_CONTENT_TYPE)
+
+
+@pytest.mark.parametrize(
+    "body, content_type",
+    [
+        (b"not json", JSON_CONTENT_TYPE),
+        (b"", None),
+        (b"\xc1", MSGPACK_CONTENT_TYPE),
+    ],
+)
+def test_decode_raises_event_decode_error_for_invalid_bodies(body, content_type):
+    with pytest.raises(EventDecodeError):
+        decode(body, content_type)
+
+
+@pytest.mark.parametrize(
+    "body, content_type",
+    [
+        (b"[1, 2]", JSON_CONTENT_TYPE),
+        (b'"player_created"', None),
+        (msgpack.packb([1, 2]), MSGPACK_CONTENT_TYPE),
+    ],
+)
+def test_decode_requires_an_object(body, content_type):
+    with pytest.raises(EventDecodeError):
+        decode(body, content_type)
@@ -0,0 +1,327 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from events import consumer as consumer_module
+from events.codec import encode
+from events.consumer import (
+    Consumer,
+    PartitionedWorkerPool,
+    ScoreBatcher,
+    event_label,
+    score_payload,
+)
+from utils.metrics import consumer_messages
+
+
+class Message:
+    def __init__(self):
+        self.settled = []
+
+    async def ack(self):
+        self.settled.append("ack")
+
+    async def reject(self, requeue=False):
+        self.settled.append("reject")
+
+
+@pytest.mark.asyncio
+async def test_worker_pool_keeps_order_per_key():
+    pool = PartitionedWorkerPool(4)
+    handled = []
+
+    def job(key, index):
+        async def run():
+            # Later jobs finish sooner, so only the pool can keep them ordered.
+            await asyncio.sleep(0.001 * (5 - index))
+            handled.append((key, index))
+
+        return run
+
+    for index in range(5):
+        for key in ("a", "b", "c"):
+            await pool.submit(key, job(key, index))
+    await pool.join()
+    await pool.close()
+
+    for key in ("a", "b", "c"):
+        assert [index for k, index in handled if k == key] == list(range(5))
+
+
+@pytest.mark.asyncio
+async def test_worker_pool_runs_different_keys_concurrently():
+    pool = PartitionedWorkerPool(2)
+    running = 0
+    peak = 0
+
+    async def job():
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.01)
+        running -= 1
+
+    # 0 and 1 hash to different workers of a pool of two.
+    await pool.submit(0, job)
+    await pool.submit(1, job)
+    await pool.join()
+    await pool.close()
+
+    assert peak == 2
+
+
+@pytest.mark.asyncio
+async def test_worker_pool_survives_failing_jobs():
+    pool = PartitionedWorkerPool(1)
+    handled = []
+
+    async def failing():
+        raise ValueError("boom")
+
+    async def succeeding():
+        handled.append("ok")
+
+    await pool.submit("key", failing)
+    await pool.submit("key", succeeding)
+    await pool.join()
+    await pool.close()
+
+    assert handled == ["ok"]
+
+
+def batcher(applied=None, apply_error=None, max_size=10, max_delay_ms=1000):
+    batches = []
+    failed = []
+
+    async def apply(scores):
+        batches.append(scores)
+        if apply_error is not None:
+            raise apply_error
+        return applied if applied is not None else set()
+
+    async def fail(message, message_data):
+        failed.append((message, message_data))
+        if message is not None:
+            await message.reject()
+
+    return ScoreBatcher(apply, fail, max_size, max_delay_ms), batches, failed
+
+
+def test_score_payload_coerces_ids_and_score():
+    assert score_payload({"player_id": "1", "team_id": 2, "score": "7"}) == {
+        "player_id": 1,
+        "team_id": 2,
+        "score": 7,
+    }
+
+
+@pytest.mark.parametrize(
+    "data",
+    [
+        None,
+        [],
+        {"team_id": 2, "score": 7},
+        {"player_id": 1, "score": 7},
+        {"player_id": 1, "team_id": 2},
+        {"player_id": "one", "team_id": 2, "score": 7},
+        {"player_id": None, "team_id": 2, "score": 7},
+    ],
+)
+def test_score_payload_rejects_malformed_data(data):
+    assert score_payload(data) is None
+
+
+@pytest.mark.asyncio
+async def test_score_batcher_folds_scores_into_one_apply_at_max_size():
+    scores, batches, failed = batcher(applied={(1, 1), (2, 1)}, max_size=3)
+    messages = [Message() for _ in range(3)]
+
+    await scores.add(messages[0], {"player_id": 1, "team_id": 1, "score": 5})
+    await scores.add(messages[1], {"player_id": 2, "team_id": 1, "score": 6})
+    assert batches == []
+    await scores.add(messages[2], {"player_id": 1, "team_id": 1, "score": 7})
+
+    assert len(batches) == 1
+    assert [score["score"] for score in batches[0]] == [5, 6, 7]
+    assert [message.settled for message in messages] == [["ack"]] * 3
+    assert failed == []
+
+
+@pytest.mark.asyncio
+async def test_score_batcher_flushes_after_max_delay():
+    scores, batches, _ = batcher(applied={(1, 1)}, max_delay_ms=10)
+    message = Message()
+
+    await scores.add(message, {"player_id": 1, "team_id": 1, "score": 5})
+    await asyncio.sleep(0.05)
+
+    assert len(batches) == 1
+    assert message.settled == ["ack"]
+    await scores.close()
+
+
+@pytest.mark.asyncio
+async def test_score_batcher_fails_scores_without_a_rating():
+    scores, _, failed = batcher(applied={(1, 1)})
+    found, missing = Message(), Message()
+
+    await scores.add(found, {"player_id": 1, "team_id": 1, "score": 5})
+    await scores.add(missing, {"player_id": 2, "team_id": 1, "score": 5})
+    await scores.flush()
+
+    assert found.settled == ["ack"]
+    assert missing.settled == ["reject"]
+    assert failed == [
+        (
+            missing,
+            {
+                "event_type": "score_created",
+                "data": {"player_id": 2, "team_id": 1, "score": 5},
+            },
+        )
+    ]
+
+
+@pytest.mark.asyncio
+async def test_score_batcher_settles_every_message_when_apply_fails():
+    scores, _, failed = batcher(apply_error=RuntimeError("database is down"))
+    messages = [Message() for _ in range(3)]
+
+    for player_id, message in enumerate(messages, start=1):
+        await scores.add(message, {"player_id": player_id, "team_id": 1, "score": 5})
+    await scores.flush()
+
+    assert [message.settled for message in messages] == [["reject"]] * 3
+    assert len(failed) == 3
+
+
+@pytest.mark.asyncio
+async def test_score_batcher_rejects_malformed_payloads_without_failing_the_batch():
+    scores, batches, _ = batcher(applied={(1, 1)})
+    valid, malformed = Message(), Message()
+
+    assert await scores.add(valid, {"player_id": 1, "team_id": 1, "score": 5})
+    assert not await scores.add(malformed, {"team_id": 1, "score": 5})
+    await scores.flush()
+
+    assert malformed.settled == ["reject"]
+    assert valid.settled == ["ack"]
+    assert batches == [[{"player_id": 1, "team_id": 1, "score": 5}]]
+
+
+@pytest.mark.asyncio
+async def test_score_batcher_keeps_settling_when_one_message_fails_to_settle():
+    class BrokenMessage(Message):
+        async def ack(self):
+            raise ConnectionError("channel closed")
+
+    scores, _, _ = batcher(applied={(1, 1), (2, 1)})
+    broken, healthy = BrokenMessage(), Message()
+
+    await scores.add(broken, {"player_id": 1, "team_id": 1, "score": 5})
+    await scores.add(healthy, {"player_id": 2, "team_id": 1, "score": 5})
+    await scores.flush()
+
+    assert healthy.settled == ["ack"]
+    assert scores.buffer == []
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "work_queue, local_event_types, publishes",
+    [
+        (False, set(), False),
+        (True, set(), True),
+        (False, {"score_created"}, True),
+        (False, {"player_created"}, False),
+    ],
+)
+async def test_apply_scores_publishes_rating_updated_when_one_replica_applies(
+    monkeypatch, work_queue, local_event_types, publishes
+):
+    publishers = []
+
+    async def apply_scores(scores, publisher=None):
+        publishers.append(publisher)
+        return set()
+
+    monkeypatch.setattr(consumer_module.RatingService, "apply_scores", apply_scores)
+    consumer = Consumer(
+        None, local_event_types=local_event_types, work_queue=work_queue
+    )
+    consumer.app = SimpleNamespace(state=SimpleNamespace(publisher="publisher"))
+
+    await consumer._apply_scores([{"player_id": 1, "team_id": 1, "score": 5}])
+
+    assert publishers == ["publisher" if publishes else None]
+
+
+@pytest.mark.parametrize(
+    "event_type, label",
+    [
+        ("score_created", "score_created"),
+        ("rating_updated", "rating_updated"),
+        ("made_up_event", "other"),
+        (None, "other"),
+        (["score_created"], "other"),
+        ({"type": "score_created"}, "other"),
+    ],
+)
+def test_event_label_maps_unknown_event_types_to_other(event_type, label):
+    assert event_label(event_type) == label
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("event_type", [["score_created"], {"a": 1}, None])
+async def test_callback_rejects_messages_without_a_string_event_type(event_type):
+    message = Message()
+    message.body, message.content_type = encode({"event_type": event_type, "data": {}})
+    message.headers = {}
+    others = consumer_messages.labels("other")
+    before = others.value
+
+    await Consumer(None, work_queue=False)._callback(None, message)
+
+    assert message.settled == ["reject"]
+    assert others.value == before + 1
+
+
+@pytest.mark.asyncio
+async def test_work_queue_copy_of_a_broadcast_event_is_not_counted_twice():
+    message = Message()
+    message.body, message.content_type = encode(
+        {"event_type": "rating_updated", "data": {"team_id": 1}}
+    )
+    message.headers = {}
+    counted = consumer_messages.labels("rating_updated")
+    before = counted.value
+
+    await Consumer(None, work_queue=True)._callback(None, message)
+
+    assert message.settled == ["ack"]
+    assert counted.value == before
+
+
+@pytest.mark.asyncio
+async def test_retry_outside_the_work_queue_discards_the_message(caplog):
+    message = Message()
+    message.headers = {}
+
+    await Consumer(None, work_queue=False)._retry(message, {"event_type": "x"})
+
+    assert message.settled == ["reject"]
+    assert "Discarding message" in caplog.text
+    assert "Dead-lettering" not in caplog.text
+
+
+@pytest.mark.asyncio
+async def test_replay_dead_letters_fails_before_connect():
+    with pytest.raises(ConnectionError, match="Call connect\\(\\) first"):
+        await Consumer(None, work_queue=True).replay_dead_letters(10)
+
+
+@pytest.mark.asyncio
+async def test_replay_dead_letters_fails_outside_the_work_queue():
+    with pytest.raises(Exception, match="only kept in work queue mode"):
+        await Consumer(None, work_queue=False).replay_dead_letters(10)
@@ -0,0 +1,74 @@
+import json
+import logging
+import sys
+
+from utils.logger import JsonFormatter, SamplingFilter, parse_sampling
+
+
+def record(
+    name, level=logging.INFO, message="message %s", args=("sent",), exc_info=None
+):
+    return logging.LogRecord(name, level, __file__, 1, message, args, exc_info)
+
+
+def test_parse_sampling_reads_rates_per_logger():
+    assert parse_sampling("events.consumer=0.01, repository=0.1,") == {
+        "events.consumer": 0.01,
+        "repository": 0.1,
+    }
+
+
+def test_sampling_filter_keeps_one_in_every_info_record_of_a_sampled_logger():
+    sampler = SamplingFilter({"events": 0.25})
+
+    kept = [sampler.filter(record("events.consumer")) for _ in range(8)]
+
+    assert kept == [True, False, False, False, True, False, False, False]
+
+
+def test_sampling_filter_always_keeps_warnings_and_unsampled_loggers():
+    sampler = SamplingFilter({"events": 0.25, "repository": 0})
+
+    assert all(
+        sampler.filter(record("events.consumer", logging.WARNING)) for _ in range(4)
+    )
+    assert all(
+        sampler.filter(record("repository.outbox", logging.ERROR)) for _ in range(4)
+    )
+    assert not sampler.filter(record("repository.outbox"))
+    assert all(sampler.filter(record("service.rating_service")) for _ in range(4))
+    # A logger that only shares a name prefix is not sampled.
+    assert all(sampler.filter(record("eventsource")) for _ in range(4))
+
+
+def test_sampling_filter_prefers_the_longest_matching_prefix():
+    sampler = SamplingFilter({"events": 0, "events.consumer": 1})
+
+    assert sampler.filter(record("events.consumer"))
+    assert not sampler.filter(record("events.publisher"))
+
+
+def test_json_formatter_writes_one_json_object_with_the_traceback():
+    try:
+        raise ValueError("boom")
+    except ValueError:
+        exc_info = sys.exc_info()
+
+    line = JsonFormatter().format(
+        record("events.consumer", logging.ERROR, exc_info=exc_info)
+    )
+    entry = json.loads(line)
+
+    assert "\n" not in line
+    assert entry["level"] == "ERROR"
+    assert entry["logger"] == "events.consumer"
+    assert entry["message"] == "message sent"
+    assert entry["exc_info"].startswith("Traceback")
+    assert "ValueError: boom" in entry["exc_info"]
+
+
+def test_json_formatter_omits_exc_info_without_an_exception():
+    entry = json.loads(JsonFormatter().format(record("events.consumer")))
+
+    assert "exc_info" not in entry
+    assert entry["timestamp"].endswith("+00:00")
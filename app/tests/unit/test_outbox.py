@@ -0,0 +1,108 @@
+import pytest
+from pydantic import ValidationError
+
+from events import consumer as consumer_module
+from events import outbox as outbox_module
+from events.codec import encode
+from events.consumer import Consumer
+from events.outbox import OutboxRelay
+from utils.config import Settings
+
+
+class Connection:
+    async def close(self):
+        pass
+
+
+class Message:
+    def __init__(self, message, headers):
+        self.body, self.content_type = encode(message)
+        self.headers = headers
+        self.settled = []
+
+    async def ack(self):
+        self.settled.append("ack")
+
+    async def reject(self, requeue=False):
+        self.settled.append("reject")
+
+
+class Broker:
+    """Publisher that confirms every message and keeps what it was sent."""
+
+    def __init__(self):
+        self.sent = []
+
+    async def publish_confirmed(self, messages, headers=None):
+        headers = headers or [None] * len(messages)
+        self.sent.extend(zip(messages, headers))
+        return [True] * len(messages)
+
+
+class OutboxRow:
+    def __init__(self, id, event_type, payload):
+        self.id = id
+        self.event_type = event_type
+        self.payload = payload
+
+    def to_message(self):
+        return {"event_type": self.event_type, "data": self.payload}
+
+
+@pytest.fixture
+def outbox(fake_database):
+    rows = []
+
+    class Repository:
+        @staticmethod
+        async def claim_batch(session, limit):
+            return rows[:limit]
+
+        @staticmethod
+        async def delete_many(session, ids):
+            rows[:] = [row for row in rows if row.id not in ids]
+
+    fake_database(outbox_module, OutboxRepository=Repository)
+    return rows
+
+
+@pytest.fixture
+def applied_scores(monkeypatch):
+    applied = []
+
+    async def apply_scores(scores, publisher=None):
+        applied.extend(scores)
+        return {(score["player_id"], score["team_id"]) for score in scores}
+
+    monkeypatch.setattr(consumer_module.RatingService, "apply_scores", apply_scores)
+    return applied
+
+
+@pytest.mark.asyncio
+async def test_relayed_score_is_applied_by_the_consumer_before_it_closes(
+    outbox, applied_scores
+):
+    score = {"player_id": 1, "team_id": 2, "score": 7}
+    outbox.append(OutboxRow(1, "score_created", score))
+    consumer = Consumer(Connection(), work_queue=False)
+    broker = Broker()
+    relay = OutboxRelay(batch_size=10)
+    relay.publisher = broker
+
+    assert await relay.relay_once() == (1, 1)
+    assert outbox == []
+
+    messages = [Message(message, headers) for message, headers in broker.sent]
+    for message in messages:
+        await consumer._callback(None, message)
+    await consumer.close()
+
+    assert applied_scores == [score]
+    assert [message.settled for message in messages] == [["ack"]]
+
+
+def test_settings_refuse_local_event_types_with_the_outbox():
+    with pytest.raises(ValidationError, match="LOCAL_EVENT_TYPES"):
+        Settings(OUTBOX_ENABLED=True, LOCAL_EVENT_TYPES="score_created")
+
+    assert Settings(OUTBOX_ENABLED=False, LOCAL_EVENT_TYPES="score_created")
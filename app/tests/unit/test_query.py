@@ -0,0 +1,83 @@
+import base64
+import json
+
+import pytest
+
+from resolver.dataloader import get_loaders
+from resolver.player_rating_schema import PlayerRatingOrder
+from resolver.schema import schema
+from service import rating_service as rating_service_module
+from service.rating_service import decode_cursor, encode_cursor
+
+
+@pytest.fixture
+def empty_team(fake_database):
+    """A database in which team 999 has no player ratings."""
+
+    class PlayerRatingRepository:
+        @staticmethod
+        async def get_players_page(session, team_id, order_by, limit, after=None):
+            return []
+
+        @staticmethod
+        async def get_players_by_team_ids(session, team_ids):
+            return []
+
+    class PlayerDailyScoreRepository:
+        @staticmethod
+        async def get_window_totals(session, team_ids, since, player_ids=None):
+            return []
+
+    fake_database(
+        rating_service_module,
+        PlayerRatingRepository=PlayerRatingRepository,
+        PlayerDailyScoreRepository=PlayerDailyScoreRepository,
+    )
+    return 999
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "arguments",
+    ["", ", first: 10", ", order_by: PLAYER_ID"],
+)
+async def test_get_players_rating_reports_an_empty_team_the_same_way_on_every_path(
+    empty_team, arguments
+):
+    result = await schema.execute(
+        f"{{ get_players_rating(team_id: {empty_team}{arguments}) {{ team_id }} }}",
+        context_value=get_loaders(),
+    )
+
+    assert result.data == {"get_players_rating": None}
+    assert [error.message for error in result.errors] == ["No players found"]
+
+
+def cursor(*values):
+    return base64.urlsafe_b64encode(json.dumps(values).encode()).decode()
+
+
+def test_decode_cursor_reads_back_an_encoded_cursor():
+    order = PlayerRatingOrder.AVERAGE_SCORE
+
+    assert decode_cursor(order, encode_cursor(order, 4.5, 7)) == (4.5, 7)
+
+
+@pytest.mark.parametrize(
+    "value",
+    [
+        "not base64 json",
+        cursor("average_score", 4.5),
+        cursor("average_score", None, 1),
+        cursor("average_score", "x", 1),
+        cursor("average_score", 4.5, [1]),
+    ],
+)
+def test_decode_cursor_rejects_forged_cursors(value):
+    with pytest.raises(Exception, match="Invalid cursor"):
+        decode_cursor(PlayerRatingOrder.AVERAGE_SCORE, value)
+
+
+def test_decode_cursor_rejects_a_cursor_for_another_order():
+    with pytest.raises(Exception, match="not created for order"):
+        decode_cursor(PlayerRatingOrder.PLAYER_ID, cursor("average_score", 4.5, 1))
@@ -0,0 +1,66 @@
+from types import SimpleNamespace
+
+import pytest
+
+from resolver.player_rating_schema import PlayerRatingInput
+from service import rating_service as rating_service_module
+from service.rating_service import RatingService
+
+
+@pytest.fixture
+def events(fake_database):
+    """Events staged and dispatched by the service, in order."""
+    recorded = []
+
+    class PlayerRatingRepository:
+        @staticmethod
+        async def add_score(session, player_id, team_id, score, window_size):
+            if player_id != 1:
+                return None
+            return SimpleNamespace(player_id=1, team_id=team_id, average_score=6.0)
+
+    class TeamRatingRepository:
+        @staticmethod
+        async def add_deltas(session, deltas):
+            pass
+
+    async def add_daily_scores(session, deltas):
+        pass
+
+    async def stage_events(session, events):
+        recorded.append(("staged", events))
+
+    async def dispatch_events(publisher, events):
+        recorded.append(("dispatched", publisher, events))
+
+    fake_database(
+        rating_service_module,
+        PlayerRatingRepository=PlayerRatingRepository,
+        TeamRatingRepository=TeamRatingRepository,
+        add_daily_scores=add_daily_scores,
+        stage_events=stage_events,
+        dispatch_events=dispatch_events,
+    )
+    return recorded
+
+
+@pytest.mark.asyncio
+async def test_update_rating_stages_and_dispatches_rating_updated(events):
+    rating = await RatingService.update_rating(
+        PlayerRatingInput(player_id=1, player_team_id=2, player_score=6), "publisher"
+    )
+
+    assert rating.player_average_rating == 6.0
+    updated = [("rating_updated", {"team_id": 2})]
+    assert events == [("staged", updated), ("dispatched", "publisher", updated)]
+
+
+@pytest.mark.asyncio
+async def test_update_rating_publishes_nothing_for_an_unknown_player(events):
+    with pytest.raises(Exception, match="Player rating not found"):
+        await RatingService.update_rating(
+            PlayerRatingInput(player_id=2, player_team_id=2, player_score=6),
+            "publisher",
+        )
+
+    assert events == []
@@ -0,0 +1,76 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from data import rebuild_ratings as rebuild_module
+from data.rebuild_ratings import RatingRebuild
+
+
+@pytest.fixture
+def written(fake_database):
+    """Replaces the database with fakes that record every write statement."""
+    calls = {"ratings": [], "buckets": []}
+    now = datetime.now(timezone.utc)
+    scores = [
+        (player_id, 5, now - timedelta(days=day))
+        for player_id in range(1, 2501)
+        for day in (0, 1)
+    ]
+
+    class PlayerRatingRepository:
+        @staticmethod
+        async def lock_team(session, team_id):
+            pass
+
+        @staticmethod
+        async def replace_many(session, player_ratings):
+            calls["ratings"].append(list(player_ratings))
+
+    class PlayerDailyScoreRepository:
+        @staticmethod
+        async def delete_by_team_id(session, team_id):
+            pass
+
+        @staticmethod
+        async def replace_many(session, buckets):
+            calls["buckets"].append(list(buckets))
+
+    class ScoreRepository:
+        @staticmethod
+        async def stream_by_team_id(session, team_id, chunk_size):
+            for start in range(0, len(scores), chunk_size):
+                yield scores[start : start + chunk_size]
+
+    class TeamRatingRepository:
+        @staticmethod
+        async def rebuild(session, team_ids):
+            pass
+
+    async def stage_events(session, events):
+        pass
+
+    fake_database(
+        rebuild_module,
+        PlayerRatingRepository=PlayerRatingRepository,
+        PlayerDailyScoreRepository=PlayerDailyScoreRepository,
+        ScoreRepository=ScoreRepository,
+        TeamRatingRepository=TeamRatingRepository,
+        stage_events=stage_events,
+    )
+    return calls
+
+
+@pytest.mark.asyncio
+async def test_rebuild_writes_a_team_larger_than_the_write_batch_size_in_batches(
+    written,
+):
+    rebuild = RatingRebuild(workers=1, chunk_size=10000, write_batch_size=1000)
+
+    assert await rebuild.run([1])
+
+    assert max(len(batch) for batch in written["ratings"]) <= 1000
+    assert max(len(batch) for batch in written["buckets"]) <= 1000
+    assert sum(len(batch) for batch in written["ratings"]) == 2500
+    assert sum(len(batch) for batch in written["buckets"]) == 5000
+    assert rebuild.players_written == 2500
+    assert rebuild.scores_read == 5000
@@ -0,0 +1,105 @@
+from datetime import date
+
+import pytest
+from sqlalchemy.dialects import postgresql
+
+# PlayerRating's relationship to Score needs both models mapped.
+from models.score_model import Score  # noqa: F401
+from repository.player_daily_score_repository import PlayerDailyScoreRepository
+from repository.player_rating_repository import PlayerRatingRepository
+from repository.team_rating_repository import TeamRatingRepository
+
+
+class Session:
+    """Records the statements it is asked to execute."""
+
+    def __init__(self):
+        self.statements = []
+
+    async def execute(self, statement, *args):
+        self.statements.append(statement.compile(dialect=postgresql.dialect()))
+        return Result()
+
+
+class Result:
+    def scalars(self):
+        return self
+
+    def all(self):
+        return []
+
+
+def bound(statement, name):
+    """Values bound for `name`, in the order the statement lists them."""
+    return [
+        value
+        for key, value in statement.params.items()
+        if key == name or key.startswith(f"{name}_m")
+    ]
+
+
+@pytest.mark.asyncio
+async def test_team_deltas_are_upserted_in_team_order():
+    session = Session()
+
+    await TeamRatingRepository.add_deltas(
+        session,
+        [
+            {"team_id": team_id, "player_count": 0, "score_sum": 5, "score_count": 1}
+            for team_id in (3, 1, 2)
+        ],
+    )
+
+    assert bound(session.statements[0], "team_id") == [1, 2, 3]
+
+
+@pytest.mark.asyncio
+async def test_daily_scores_are_upserted_in_team_and_player_order():
+    session = Session()
+
+    await PlayerDailyScoreRepository.add_scores(
+        session,
+        date(2026, 1, 1),
+        [
+            {
+                "team_id": team_id,
+                "player_id": player_id,
+                "score_sum": 5,
+                "score_count": 1,
+            }
+            for team_id, player_id in ((2, 1), (1, 2), (1, 1))
+        ],
+    )
+
+    statement = session.statements[0]
+    assert list(zip(bound(statement, "team_id"), bound(statement, "player_id"))) == [
+        (1, 1),
+        (1, 2),
+        (2, 1),
+    ]
+
+
+@pytest.mark.asyncio
+async def test_score_deltas_lock_player_ratings_in_key_order_before_updating():
+    session = Session()
+
+    await PlayerRatingRepository.add_score_deltas(
+        session,
+        [
+            {
+                "team_id": team_id,
+                "player_id": player_id,
+                "score_sum": 5,
+                "score_count": 1,
+                "scores": [5],
+            }
+            for team_id, player_id in ((2, 1), (1, 2))
+        ],
+        window_size=10,
+    )
+
+    lock, update = (str(statement) for statement in session.statements)
+    assert lock.endswith(
+        "ORDER BY player_ratings.team_id, player_ratings.player_id FOR UPDATE"
+    )
+    assert update.startswith("UPDATE player_ratings")
@@ -0,0 +1,72 @@
+import pytest
+
+from models.team_rating_model import TeamRating
+from service import rating_service as rating_service_module
+from service.rating_service import RatingService, team_deltas
+
+
+@pytest.fixture
+def team_ratings(fake_database):
+    """A database holding the TeamRating rows of the returned dict."""
+    rows = {}
+
+    class TeamRatingRepository:
+        @staticmethod
+        async def get_by_team_id(session, team_id):
+            return rows.get(team_id)
+
+    fake_database(rating_service_module, TeamRatingRepository=TeamRatingRepository)
+    return rows
+
+
+def test_team_deltas_folds_new_player_ratings_per_team():
+    deltas = team_deltas(
+        [
+            {"team_id": 1, "average_score": 4.0, "total_of_scores": 2},
+            {"team_id": 1, "average_score": 6.0, "total_of_scores": 1},
+            {"team_id": "2", "average_score": 5.0, "total_of_scores": 1},
+        ],
+        new_players=True,
+    )
+
+    assert deltas == [
+        {"team_id": 1, "player_count": 2, "score_sum": 14.0, "score_count": 3},
+        {"team_id": 2, "player_count": 1, "score_sum": 5.0, "score_count": 1},
+    ]
+
+
+def test_team_deltas_folds_score_deltas_without_adding_players():
+    deltas = team_deltas(
+        [
+            {"team_id": 1, "score_sum": 7, "score_count": 1},
+            {"team_id": 1, "score_sum": 9, "score_count": 2},
+        ]
+    )
+
+    assert deltas == [
+        {"team_id": 1, "player_count": 0, "score_sum": 16, "score_count": 3}
+    ]
+
+
+@pytest.mark.asyncio
+async def test_get_team_rating_maps_the_aggregate_row(team_ratings):
+    team_ratings[1] = TeamRating(
+        team_id=1, player_count=3, score_sum=21.0, score_count=4, average_score=5.25
+    )
+
+    team_rating = await RatingService.get_team_rating(1)
+
+    assert team_rating.team_id == 1
+    assert team_rating.player_count == 3
+    assert team_rating.score_count == 4
+    assert team_rating.team_average_rating == 5.25
+
+
+@pytest.mark.asyncio
+async def test_get_team_rating_keeps_a_missing_average_and_team(team_ratings):
+    team_ratings[1] = TeamRating(
+        team_id=1, player_count=0, score_sum=0, score_count=0, average_score=None
+    )
+
+    assert (await RatingService.get_team_rating(1)).team_average_rating is None
+    assert await RatingService.get_team_rating(2) is None
@@ -1,4 +1,2 @@
-
-
 def test_user_model():
     pass